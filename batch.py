@@ -0,0 +1,186 @@
+import numpy as np
+
+from cache import annuity_payment
+from schedule import AmortizationSchedule
+
+
+def matriz_amortizaciones(amortizaciones_por_escenario, num_meses):
+    """
+    Convierte las listas de amortizaciones extraordinarias de cada escenario en matrices densas.
+
+    Args:
+        amortizaciones_por_escenario (list): Un AmortizationSchedule o una lista de diccionarios 'mes', 'monto'
+            y 'tipo' por escenario, en el mismo formato que acepta `simulacion_hipoteca`.
+        num_meses (int): Número de columnas (meses) de las matrices.
+
+    Returns:
+        tuple: (montos, reduce_cuota) de forma (escenarios x meses). `reduce_cuota` es True donde la
+            amortización es de tipo 'cuota'.
+    """
+    num_escenarios = len(amortizaciones_por_escenario)
+    montos = np.zeros((num_escenarios, num_meses))
+    reduce_cuota = np.zeros((num_escenarios, num_meses), dtype=bool)
+
+    for i, amortizaciones in enumerate(amortizaciones_por_escenario):
+        for amort in AmortizationSchedule.compile(amortizaciones):
+            mes = amort['mes']
+            if mes > num_meses:
+                continue
+            montos[i, mes - 1] = amort['monto']
+            reduce_cuota[i, mes - 1] = amort['tipo'] == 'cuota'
+
+    return montos, reduce_cuota
+
+
+def simulacion_hipoteca_lote(capital, interes_anual, plazo_anos, vinculaciones=0, amortizaciones_extraordinarias=None, reduce_cuota=None, comision_amortizacion=0, tamano_bloque=10000, detalle=False):
+    """
+    Simula a la vez muchas hipotecas con las mismas reglas que `simulacion_hipoteca`.
+
+    Cada mes se calcula para todos los escenarios con operaciones NumPy; los préstamos que terminan
+    antes quedan enmascarados. Los escenarios se procesan en bloques de `tamano_bloque` para limitar
+    la memoria de las matrices (escenarios x meses).
+
+    Args:
+        capital (array): Monto del préstamo de cada escenario.
+        interes_anual (array): Tasa de interés anual en porcentaje de cada escenario.
+        plazo_anos (array): Plazo en años de cada escenario.
+        vinculaciones (array): Coste mensual de las vinculaciones (seguros, alarma...) de cada escenario, o una
+            matriz (escenarios x meses) con el coste de cada mes, por ejemplo ExpenseCalendar.totals[None, :].
+        amortizaciones_extraordinarias (array | list): Matriz (escenarios x meses) con el monto amortizado
+            cada mes, o una lista por escenario de AmortizationSchedule o de diccionarios 'mes', 'monto' y 'tipo'.
+        reduce_cuota (array): Matriz booleana (escenarios x meses), True donde la amortización es de tipo
+            'cuota'. Solo se usa cuando `amortizaciones_extraordinarias` es una matriz.
+        comision_amortizacion (array): Porcentaje de comisión sobre las amortizaciones extraordinarias.
+        tamano_bloque (int): Número de escenarios simulados en cada bloque.
+        detalle (bool): Si es True, añade las matrices mensuales de amortización, intereses, saldo y cuota.
+
+    Returns:
+        dict: Arrays por escenario con "Cuota Mensual Base", "Cuota Mensual Total", "Total Anual",
+            "Total Pagado" y "Num Pagos".
+    """
+    claves = ["Cuota Mensual Base", "Cuota Mensual Total", "Total Anual", "Total Pagado", "Num Pagos"]
+    if detalle:
+        claves += ["Amortización", "Intereses", "Saldo Restante", "Cuota"]
+    return _simular_por_bloques(_simular_bloque, claves, capital, interes_anual, plazo_anos, vinculaciones,
+                                amortizaciones_extraordinarias, reduce_cuota, comision_amortizacion, tamano_bloque,
+                                detalle=detalle)
+
+
+def _simular_por_bloques(simular_bloque, claves, capital, interes_anual, plazo_anos, vinculaciones, amortizaciones_extraordinarias, reduce_cuota, comision_amortizacion, tamano_bloque, **opciones):
+    """
+    Normaliza las entradas de `simulacion_hipoteca_lote` y simula los escenarios en bloques de `tamano_bloque`.
+
+    `simular_bloque` recibe las entradas de cada bloque, el número de meses y `opciones`, y devuelve un
+    diccionario con al menos `claves`; los resultados de los bloques se concatenan.
+    """
+    capital, interes_anual, plazo_anos, comision_amortizacion = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(v, dtype=float)) for v in (capital, interes_anual, plazo_anos, comision_amortizacion)))
+    num_escenarios = len(capital)
+    num_meses = int(np.max(plazo_anos)) * 12 if num_escenarios else 0
+
+    vinculaciones = np.asarray(vinculaciones, dtype=float)
+    if vinculaciones.ndim == 2:
+        # calendario mensual de vinculaciones: se completa con ceros hasta el último mes
+        meses = np.zeros((vinculaciones.shape[0], num_meses))
+        meses[:, :min(num_meses, vinculaciones.shape[1])] = vinculaciones[:, :num_meses]
+        vinculaciones = np.broadcast_to(meses, (num_escenarios, num_meses))
+    else:
+        vinculaciones = np.broadcast_to(np.atleast_1d(vinculaciones), (num_escenarios,))
+
+    es_lista = amortizaciones_extraordinarias is not None and not isinstance(amortizaciones_extraordinarias, np.ndarray)
+    if amortizaciones_extraordinarias is not None and not es_lista:
+        amortizaciones_extraordinarias = np.atleast_2d(amortizaciones_extraordinarias)
+        if reduce_cuota is None:
+            reduce_cuota = np.zeros(amortizaciones_extraordinarias.shape, dtype=bool)
+        reduce_cuota = np.atleast_2d(reduce_cuota)
+
+    bloques = {clave: [] for clave in claves}
+
+    for inicio in range(0, max(num_escenarios, 1), tamano_bloque):
+        bloque = slice(inicio, inicio + tamano_bloque)
+        if amortizaciones_extraordinarias is None:
+            montos = cuota_mask = None
+        elif es_lista:
+            montos, cuota_mask = matriz_amortizaciones(amortizaciones_extraordinarias[bloque], num_meses)
+        else:
+            montos, cuota_mask = amortizaciones_extraordinarias[bloque], reduce_cuota[bloque]
+
+        resultado = simular_bloque(capital[bloque], interes_anual[bloque], plazo_anos[bloque], vinculaciones[bloque],
+                                   montos, cuota_mask, comision_amortizacion[bloque], num_meses, **opciones)
+        for clave in claves:
+            bloques[clave].append(resultado[clave])
+
+    return {clave: np.concatenate(bloques[clave]) for clave in claves}
+
+
+def _simular_bloque(capital, interes_anual, plazo_anos, vinculaciones, montos, reduce_cuota, comision_amortizacion, num_meses, detalle):
+    interes_mensual = (interes_anual / 100) / 12
+    num_pagos = (plazo_anos * 12).astype(int)
+
+    cuota_mensual_base = annuity_payment(capital, interes_mensual, num_pagos)
+    vinculaciones_mes = (lambda mes: vinculaciones[:, mes - 1]) if vinculaciones.ndim == 2 else (lambda mes: vinculaciones)
+    cuota_mensual_total = cuota_mensual_base + (vinculaciones_mes(1) if num_meses else 0)
+    factor_comision = 1 + comision_amortizacion / 100
+
+    saldo_restante = capital.copy()
+    total_pagado = np.zeros(len(capital))
+    total_anual = np.zeros(len(capital))
+    pagos = np.zeros(len(capital), dtype=int)
+    activo = np.ones(len(capital), dtype=bool)
+
+    if detalle:
+        forma = (len(capital), num_meses)
+        amortizaciones, intereses, saldos, cuotas = (np.zeros(forma) for _ in range(4))
+
+    for mes in range(1, num_meses + 1):
+        activo &= mes <= num_pagos
+        if not activo.any():
+            break
+
+        if montos is not None and mes <= montos.shape[1]:
+            con_extra = activo & (montos[:, mes - 1] != 0)
+            if con_extra.any():
+                saldo_restante = np.where(con_extra, saldo_restante - montos[:, mes - 1] * factor_comision, saldo_restante)
+                recalcular = con_extra & reduce_cuota[:, mes - 1]
+                if recalcular.any():
+                    nueva_cuota = annuity_payment(saldo_restante, interes_mensual, num_pagos - mes + 1)
+                    cuota_mensual_base = np.where(recalcular, nueva_cuota, cuota_mensual_base)
+
+        interes_mes = saldo_restante * interes_mensual
+        amortizacion_mes = cuota_mensual_base - interes_mes
+
+        # Evitar saldo negativo
+        ultimo = saldo_restante < amortizacion_mes
+        amortizacion_mes = np.where(ultimo, saldo_restante, amortizacion_mes)
+        cuota_mensual_base = np.where(ultimo & activo, interes_mes + amortizacion_mes, cuota_mensual_base)
+
+        cuota_actual = np.where(activo, amortizacion_mes + interes_mes + vinculaciones_mes(mes), 0)
+        saldo_restante = np.where(activo, saldo_restante - amortizacion_mes, saldo_restante)
+        total_pagado += cuota_actual
+        if mes <= 12:
+            total_anual += cuota_actual
+        pagos += activo
+
+        if detalle:
+            amortizaciones[:, mes - 1] = np.where(activo, amortizacion_mes, 0)
+            intereses[:, mes - 1] = np.where(activo, interes_mes, 0)
+            saldos[:, mes - 1] = np.where(activo, np.maximum(saldo_restante, 0), 0)
+            cuotas[:, mes - 1] = cuota_actual
+
+        activo &= saldo_restante > 0
+
+    resultado = {
+        "Cuota Mensual Base": np.round(cuota_mensual_base, 2),
+        "Cuota Mensual Total": np.round(cuota_mensual_total, 2),
+        "Total Anual": np.round(total_anual, 2),
+        "Total Pagado": np.round(total_pagado, 2),
+        "Num Pagos": pagos
+    }
+    if detalle:
+        resultado.update({
+            "Amortización": amortizaciones,
+            "Intereses": intereses,
+            "Saldo Restante": saldos,
+            "Cuota": cuotas
+        })
+    return resultado
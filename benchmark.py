@@ -0,0 +1,173 @@
+"""
+Benchmarks of the simulators.
+
+    python benchmark.py --output bench.json
+    python benchmark.py --save-baseline baseline.json
+    python benchmark.py --baseline baseline.json --tolerance 0.2
+
+Each case is timed `--repeat` times and then run once more under tracemalloc to get its peak memory.
+With --baseline the median times are compared with the stored ones and the exit code is 1 if any case
+is slower than the baseline by more than the tolerance.
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from closed_form import SimulacionAnalitica
+from main import Mortage
+from main_ import simulacion_hipoteca
+from portfolio import loans_from_arrays, project_cash_flows
+from sweep import run_sweep
+
+
+def _mortage(expenses:bool):
+    def run():
+        mortage = Mortage(378000, 2.1, 30)
+        if expenses:
+            mortage.add_related_expense('seguro de vida', 266, 'quarterly')
+            mortage.add_related_expense('seguro de vivienda', 641, 'yearly')
+            mortage.add_related_expense('alarma', 55, 'monthly')
+        mortage.simulate([{'mes': 36, 'monto': 10000, 'tipo': 'cuota'}])
+    return run
+
+
+def _simulacion(num_amortizaciones:int):
+    meses = np.linspace(1, 360, num_amortizaciones, dtype=int) if num_amortizaciones else []
+    amortizaciones = [{'mes': mes, 'monto': 500, 'tipo': 'cuota' if i % 2 else 'plazo'} for i, mes in enumerate(meses)]
+
+    def run():
+        simulacion_hipoteca(378000, 2.1, 30, seguro_vida=266/3, seguro_vivienda=641/12, alarma=55,
+                            amortizaciones_extraordinarias=amortizaciones, comision_amortizacion=0.5, salida=None)
+    return run
+
+
+def _analitica(num_amortizaciones:int):
+    meses = np.linspace(1, 360, num_amortizaciones, dtype=int) if num_amortizaciones else []
+    amortizaciones = [{'mes': mes, 'monto': 500, 'tipo': 'cuota' if i % 2 else 'plazo'} for i, mes in enumerate(meses)]
+
+    def run():
+        SimulacionAnalitica(378000, 2.1, 30, seguro_vida=266/3, seguro_vivienda=641/12, alarma=55,
+                            amortizaciones_extraordinarias=amortizaciones, comision_amortizacion=0.5).resumen()
+    return run
+
+
+def _sweep(num_escenarios:int, workers:int):
+    # main_.py-style sweep: yearly amortizations switching from 'cuota' to 'plazo', over several amounts
+    cambios = range(0, 30)
+    montos = np.linspace(1000, 20000, max(1, num_escenarios // len(cambios)))
+    grid = {'cambio_ano': list(cambios)[:num_escenarios], 'monto': list(montos)}
+
+    def run():
+        run_sweep(grid, vinculaciones=266/3 + 641/12 + 55, workers=workers, chunk_size=10000)
+    return run
+
+
+def _portfolio(num_loans:int):
+    rng = np.random.default_rng(0)
+    loans, banks = loans_from_arrays(rng.uniform(50000, 500000, num_loans), rng.uniform(0, 5, num_loans),
+                                     rng.integers(5, 40, num_loans), rng.integers(0, 60, num_loans),
+                                     rng.choice(['A', 'B', 'C'], num_loans))
+
+    def run():
+        project_cash_flows(loans, banks, by_bank=True)
+    return run
+
+
+def cases(workers:int=1) -> dict:
+    return {
+        'mortage_simulate': _mortage(expenses=False),
+        'mortage_simulate_expenses': _mortage(expenses=True),
+        'simulacion_hipoteca_0_extras': _simulacion(0),
+        'simulacion_hipoteca_10_extras': _simulacion(10),
+        'simulacion_hipoteca_360_extras': _simulacion(360),
+        'closed_form_0_extras': _analitica(0),
+        'closed_form_10_extras': _analitica(10),
+        'sweep_1': _sweep(1, workers),
+        'sweep_1k': _sweep(1000, workers),
+        'sweep_100k': _sweep(100000, workers),
+        'portfolio_100k': _portfolio(100000),
+    }
+
+
+def measure(function, repeat:int) -> dict:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'repeat': repeat,
+        'min_s': min(times),
+        'median_s': statistics.median(times),
+        'mean_s': statistics.fmean(times),
+        'peak_bytes': peak,
+    }
+
+
+def compare(results:dict, baseline:dict, tolerance:float) -> list[str]:
+    """
+    Names of the cases whose median time exceeds the baseline by more than `tolerance` (0.1 for 10%).
+    """
+    regressions = []
+    for name, result in results['results'].items():
+        reference = baseline['results'].get(name)
+        if reference is None:
+            continue
+        ratio = result['median_s'] / reference['median_s']
+        status = 'REGRESSION' if ratio > 1 + tolerance else 'ok'
+        print(f"{name:35} {reference['median_s']:10.4f}s -> {result['median_s']:10.4f}s  x{ratio:5.2f}  {status}")
+        if status != 'ok':
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks of Mortage.simulate, simulacion_hipoteca and the sweeps.")
+    parser.add_argument('--repeat', type=int, default=5, help="timed runs of each case")
+    parser.add_argument('--only', nargs='*', help="cases to run (all by default)")
+    parser.add_argument('--workers', type=int, default=1, help="worker processes of the sweeps")
+    parser.add_argument('--output', help="JSON file with the results")
+    parser.add_argument('--save-baseline', help="store the results as the baseline in this JSON file")
+    parser.add_argument('--baseline', help="JSON baseline to compare with")
+    parser.add_argument('--tolerance', type=float, default=0.1, help="allowed slowdown over the baseline")
+    args = parser.parse_args(argv)
+
+    selected = {name: case for name, case in cases(args.workers).items() if not args.only or name in args.only}
+    results = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'results': {},
+    }
+    for name, case in selected.items():
+        results['results'][name] = measure(case, args.repeat)
+        result = results['results'][name]
+        print(f"{name:35} median {result['median_s']:.4f}s  min {result['min_s']:.4f}s  peak {result['peak_bytes'] / 1024 ** 2:.1f} MB")
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+import functools
+import hashlib
+import json
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+@functools.lru_cache(maxsize=4096)
+def annuity_factor(monthly_rate:float, months:float) -> float:
+    """
+    Present value of paying 1 every month: the monthly payment of a debt is debt / annuity_factor.
+    """
+    if monthly_rate == 0:
+        return months
+    return (1 - (1 + monthly_rate) ** -months) / monthly_rate
+
+
+def annuity_payment(debt, monthly_rate, months):
+    """
+    Monthly payment of `debt` over `months`, element-wise for arrays: debt / months at a 0% rate.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        payment = debt * monthly_rate / (1 - (1 + monthly_rate) ** -months)
+        return np.where(monthly_rate == 0, debt / months, payment)
+
+
+def _canonical(value):
+    if hasattr(value, 'to_dict'):
+        return value.to_dict()
+    if hasattr(value, 'events'):
+        return sorted(value.events, key=lambda e: (e['mes'], e['tipo'], e['monto']))
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError(f"Value of type {type(value).__name__} can not be part of a cache key")
+
+
+class ResultCache:
+    """
+    Cache of simulation results keyed by a hash of their full input.
+
+    Results are kept in memory (least recently used first out) up to `max_bytes`, measured by their
+    pickled size. With a `directory` they are also stored on disk, where the oldest files are removed
+    when the directory exceeds `max_disk_bytes`. The size of the directory is scanned once and then tracked
+    in memory; it is only scanned again to evict, down to 90% of `max_disk_bytes` so evictions are rare.
+    """
+
+    def __init__(self, max_bytes:int=64 * 1024 ** 2, directory:str=None, max_disk_bytes:int=512 * 1024 ** 2):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._disk_size = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._disk_size = sum(size for _, _, size in self._disk_files())
+
+    @staticmethod
+    def key(inputs:dict) -> str:
+        canonical = json.dumps(inputs, sort_keys=True, default=_canonical, separators=(',', ':'))
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def get(self, key:str):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return pickle.loads(self._entries[key])
+
+        data = self._read_disk(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._store(key, data)
+        return pickle.loads(data)
+
+    def put(self, key:str, value):
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._store(key, data)
+        self._write_disk(key, data)
+
+    def get_or_compute(self, inputs:dict, compute):
+        """
+        Returns the cached result of `inputs` or computes it with compute() and caches it.
+        """
+        key = self.key(inputs)
+        result = self.get(key)
+        if result is None:
+            result = compute()
+            self.put(key, result)
+        return result
+
+    def stats(self) -> dict:
+        annuity = annuity_factor.cache_info()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(self._entries),
+            'bytes': self._size,
+            'disk_bytes': self._disk_size,
+            'annuity_hits': annuity.hits,
+            'annuity_misses': annuity.misses,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self.hits = self.misses = 0
+
+    def _store(self, key:str, data:bytes):
+        if key in self._entries:
+            self._size -= len(self._entries.pop(key))
+        if len(data) > self.max_bytes:
+            return
+        self._entries[key] = data
+        self._size += len(data)
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    def _path(self, key:str) -> str:
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def _read_disk(self, key:str):
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key), 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        os.utime(self._path(key))
+        return data
+
+    def _write_disk(self, key:str, data:bytes):
+        if not self.directory:
+            return
+        try:
+            previous = os.stat(self._path(key)).st_size
+        except FileNotFoundError:
+            previous = 0
+        tmp = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, self._path(key))
+
+        with self._lock:
+            self._disk_size += len(data) - previous
+            full = self._disk_size > self.max_disk_bytes
+        if full:
+            self._evict_disk()
+
+    def _disk_files(self) -> list:
+        """
+        (modification time, path, size) of the cached files.
+        """
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.pkl'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, entry.path, stat.st_size))
+        return files
+
+    def _evict_disk(self):
+        # other processes can share the directory, so its real size is scanned before evicting
+        files = sorted(self._disk_files())
+        total = sum(size for _, _, size in files)
+        for _, path, size in files:
+            if total <= 0.9 * self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        with self._lock:
+            self._disk_size = total
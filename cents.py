@@ -0,0 +1,162 @@
+import numpy as np
+
+from batch import _simular_por_bloques
+
+REDONDEOS = ('half_even', 'half_up', 'truncate')
+
+# los tipos en porcentaje se guardan como enteros en millonésimas de punto (2.1 % -> 2100000)
+_ESCALA_TIPOS = 10 ** 6
+
+
+def _dividir(numerador, denominador, redondeo:str):
+    """
+    numerador / denominador redondeado a entero con la regla dada, exacto con enteros (numerador >= 0).
+    """
+    cociente, resto = np.divmod(numerador, denominador)
+    if redondeo == 'truncate':
+        return cociente
+    if redondeo == 'half_up':
+        return cociente + (2 * resto >= denominador)
+    return cociente + ((2 * resto > denominador) | ((2 * resto == denominador) & (cociente % 2 == 1)))
+
+
+def _redondear(valor, redondeo:str):
+    """
+    Redondea importes en float a enteros con la regla dada.
+    """
+    valor = np.asarray(valor, dtype=float)
+    if redondeo == 'truncate':
+        valor = np.trunc(valor)
+    elif redondeo == 'half_up':
+        valor = np.floor(valor + 0.5)
+    else:
+        valor = np.rint(valor)
+    return valor.astype(np.int64)
+
+
+def _a_centimos(euros, redondeo:str):
+    return _redondear(np.asarray(euros, dtype=float) * 100, redondeo)
+
+
+def simulacion_hipoteca_centimos(capital, interes_anual, plazo_anos, vinculaciones=0, amortizaciones_extraordinarias=None, reduce_cuota=None, comision_amortizacion=0, redondeo='half_even', tamano_bloque=10000, detalle=False):
+    """
+    Simula muchas hipotecas como `simulacion_hipoteca_lote` pero en céntimos enteros (int64), redondeando cada cuota.
+
+    Como en los extractos de los bancos, la cuota, los intereses de cada mes, la comisión de cada amortización
+    extraordinaria y las vinculaciones se redondean al céntimo al calcularse, y la amortización y el saldo se
+    obtienen restando céntimos exactos. Los intereses se calculan con aritmética entera (sin errores de coma
+    flotante); solo la cuota de la anualidad, que necesita una potencia, se calcula en float antes de redondearla.
+
+    Args:
+        capital, interes_anual, plazo_anos, vinculaciones, amortizaciones_extraordinarias, reduce_cuota,
+        comision_amortizacion, tamano_bloque: Los mismos que `simulacion_hipoteca_lote`.
+        redondeo (str): 'half_even' (redondeo bancario), 'half_up' o 'truncate'.
+        detalle (bool): Si es True, añade las matrices mensuales en céntimos de "Amortización", "Intereses",
+            "Saldo Restante" y "Cuota".
+
+    Returns:
+        dict: Arrays por escenario en euros con "Cuota Mensual Base", "Cuota Mensual Total", "Total Anual",
+            "Total Pagado" e "Intereses Totales", y "Num Pagos". Las sumas son exactas: son enteros de céntimos.
+    """
+    if redondeo not in REDONDEOS:
+        raise ValueError(f"Invalid rounding {redondeo!r}, expected one of {REDONDEOS}")
+
+    claves = ["Cuota Mensual Base", "Cuota Mensual Total", "Total Anual", "Total Pagado", "Intereses Totales", "Num Pagos"]
+    if detalle:
+        claves += ["Amortización", "Intereses", "Saldo Restante", "Cuota"]
+    return _simular_por_bloques(_simular_bloque_centimos, claves, capital, interes_anual, plazo_anos, vinculaciones,
+                                amortizaciones_extraordinarias, reduce_cuota, comision_amortizacion, tamano_bloque,
+                                redondeo=redondeo, detalle=detalle)
+
+
+def _cuota_centimos(saldo, tipo, num_pagos_restantes, redondeo):
+    # los escenarios que ya terminaron pueden llegar con 0 pagos restantes, su cuota no se usa
+    num_pagos_restantes = np.maximum(num_pagos_restantes, 1)
+    interes_mensual = tipo / _ESCALA_TIPOS / 100 / 12
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cuota = np.where(interes_mensual == 0, saldo / num_pagos_restantes,
+                         saldo * interes_mensual / (1 - (1 + interes_mensual) ** -num_pagos_restantes))
+    return _redondear(cuota, redondeo)
+
+
+def _simular_bloque_centimos(capital, interes_anual, plazo_anos, vinculaciones, montos, reduce_cuota, comision_amortizacion, num_meses, redondeo, detalle):
+    n = len(capital)
+    tipo = np.rint(interes_anual * _ESCALA_TIPOS).astype(np.int64)
+    comision = np.rint(comision_amortizacion * _ESCALA_TIPOS).astype(np.int64)
+    divisor_intereses = 12 * 100 * _ESCALA_TIPOS
+    num_pagos = (plazo_anos * 12).astype(np.int64)
+
+    saldo = _a_centimos(capital, redondeo)
+    cuota_base = _cuota_centimos(saldo, tipo, num_pagos, redondeo)
+    costes_mes = (lambda mes: _a_centimos(vinculaciones[:, mes - 1], redondeo)) if vinculaciones.ndim == 2 else \
+        (lambda mes, costes=_a_centimos(vinculaciones, redondeo): costes)
+    cuota_total = cuota_base + (costes_mes(1) if num_meses else 0)
+    montos = _a_centimos(montos, redondeo) if montos is not None else None
+
+    total_pagado = np.zeros(n, dtype=np.int64)
+    total_anual = np.zeros(n, dtype=np.int64)
+    total_intereses = np.zeros(n, dtype=np.int64)
+    pagos = np.zeros(n, dtype=np.int64)
+    activo = np.ones(n, dtype=bool)
+
+    if detalle:
+        forma = (n, num_meses)
+        amortizaciones, intereses, saldos, cuotas = (np.zeros(forma, dtype=np.int64) for _ in range(4))
+
+    for mes in range(1, num_meses + 1):
+        activo &= mes <= num_pagos
+        if not activo.any():
+            break
+
+        if montos is not None and mes <= montos.shape[1]:
+            con_extra = activo & (montos[:, mes - 1] != 0)
+            if con_extra.any():
+                monto = montos[:, mes - 1]
+                monto_total = monto + _dividir(monto * comision, 100 * _ESCALA_TIPOS, redondeo)
+                saldo = np.where(con_extra, saldo - monto_total, saldo)
+                recalcular = con_extra & reduce_cuota[:, mes - 1]
+                if recalcular.any():
+                    nueva_cuota = _cuota_centimos(np.maximum(saldo, 0), tipo, num_pagos - mes + 1, redondeo)
+                    cuota_base = np.where(recalcular, nueva_cuota, cuota_base)
+
+        # una amortización extraordinaria puede dejar el saldo negativo: ese mes no hay intereses y se termina
+        interes_mes = _dividir(np.maximum(saldo, 0) * tipo, divisor_intereses, redondeo)
+        amortizacion_mes = cuota_base - interes_mes
+
+        # Evitar saldo negativo
+        ultimo = saldo < amortizacion_mes
+        amortizacion_mes = np.where(ultimo, saldo, amortizacion_mes)
+        cuota_base = np.where(ultimo & activo, interes_mes + amortizacion_mes, cuota_base)
+
+        cuota_actual = np.where(activo, amortizacion_mes + interes_mes + costes_mes(mes), 0)
+        saldo = np.where(activo, saldo - amortizacion_mes, saldo)
+        total_pagado += cuota_actual
+        total_intereses += np.where(activo, interes_mes, 0)
+        if mes <= 12:
+            total_anual += cuota_actual
+        pagos += activo
+
+        if detalle:
+            amortizaciones[:, mes - 1] = np.where(activo, amortizacion_mes, 0)
+            intereses[:, mes - 1] = np.where(activo, interes_mes, 0)
+            saldos[:, mes - 1] = np.where(activo, np.maximum(saldo, 0), 0)
+            cuotas[:, mes - 1] = cuota_actual
+
+        activo &= saldo > 0
+
+    resultado = {
+        "Cuota Mensual Base": cuota_base / 100,
+        "Cuota Mensual Total": cuota_total / 100,
+        "Total Anual": total_anual / 100,
+        "Total Pagado": total_pagado / 100,
+        "Intereses Totales": total_intereses / 100,
+        "Num Pagos": pagos
+    }
+    if detalle:
+        resultado.update({
+            "Amortización": amortizaciones,
+            "Intereses": intereses,
+            "Saldo Restante": saldos,
+            "Cuota": cuotas
+        })
+    return resultado
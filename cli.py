@@ -0,0 +1,126 @@
+"""
+Command line simulator of a mortage.
+
+    python cli.py --capital 378000 --interest 2.1 --term 30 --bank Sabadell \
+        --expense "seguro de vida:266:quarterly" --prepayment 36:10000:cuota --format json
+
+pandas and matplotlib are only imported when --history-table or --plot are requested.
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import sys
+
+from main import Mortage, summarize
+from schedule import AmortizationSchedule
+
+
+def _parse_expense(value:str) -> dict:
+    name, amount, frequency = value.rsplit(':', 2)
+    return {'name': name, 'value': float(amount), 'frequency': frequency}
+
+
+def _parse_prepayment(value:str) -> dict:
+    mes, monto, tipo = value.split(':')
+    return {'mes': int(mes), 'monto': float(monto), 'tipo': tipo}
+
+
+def load_config(path:str) -> dict:
+    """
+    Reads the loan parameters from a JSON or YAML file (YAML requires PyYAML).
+    """
+    with open(path) as f:
+        if os.path.splitext(path)[1].lower() in ('.yaml', '.yml'):
+            try:
+                import yaml
+            except ImportError as e:
+                raise SystemExit(f"Reading {path} requires PyYAML") from e
+            return yaml.safe_load(f) or {}
+        return json.load(f)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Simulates a mortage and prints its summary.")
+    parser.add_argument('--config', help="JSON or YAML file with the loan; command line arguments take precedence")
+    parser.add_argument('--capital', type=float, help="loan amount")
+    parser.add_argument('--interest', type=float, help="annual interest in percentage")
+    parser.add_argument('--term', type=int, help="term in years")
+    parser.add_argument('--bank', help="bank name")
+    parser.add_argument('--expense', action='append', type=_parse_expense, default=[],
+                        help="related expense as name:value:frequency (monthly, quarterly, yearly), repeatable")
+    parser.add_argument('--prepayment', action='append', type=_parse_prepayment, default=[],
+                        help="extra amortization as month:amount:type (cuota or plazo), repeatable")
+    parser.add_argument('--prepayment-fee', type=float, help="commission of the extra amortizations (0.005 for 0.5%%)")
+    parser.add_argument('--format', choices=['text', 'json', 'csv'], default='text', help="format of the printed summary")
+    parser.add_argument('--output', help="write the summary to this file instead of stdout")
+    parser.add_argument('--history', help="export the monthly history to a .csv, .parquet or .npy file")
+    parser.add_argument('--history-table', action='store_true', help="print the first rows of the history (needs pandas)")
+    parser.add_argument('-v', '--verbose', action='store_true', help="log every simulated month on stderr")
+    parser.add_argument('--plot', nargs='?', const='', help="plot the simulation, to a file if a path is given (needs matplotlib)")
+    return parser
+
+
+def format_summary(summary:dict, format:str) -> str:
+    if format == 'json':
+        # NaN (no installments to summarize) is not valid JSON
+        return json.dumps({k: None if isinstance(v, float) and math.isnan(v) else v for k, v in summary.items()},
+                          allow_nan=False)
+    if format == 'csv':
+        return ','.join(summary) + '\n' + ','.join(str(v) for v in summary.values())
+    return '\n'.join(f"{k}: {v}" for k, v in summary.items())
+
+
+def run(args) -> Mortage:
+    config = load_config(args.config) if args.config else {}
+
+    capital = args.capital if args.capital is not None else config.get('capital')
+    interest = args.interest if args.interest is not None else config.get('interest')
+    term = args.term if args.term is not None else config.get('term')
+    if capital is None or interest is None or term is None:
+        raise SystemExit("capital, interest and term are required, as arguments or in --config")
+
+    bank = args.bank or config.get('bank_name')
+    fee = args.prepayment_fee if args.prepayment_fee is not None else config.get('amortization_interest', 0)
+    schedule = AmortizationSchedule(config.get('prepayments', []) + args.prepayment)
+
+    mortage = Mortage(capital, interest, term)
+    if bank:
+        mortage.set_bank_data(bank_name=bank)
+    for expense in config.get('expenses', []) + args.expense:
+        mortage.add_related_expense(**expense)
+    mortage.simulate(schedule, fee)
+    return mortage
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.verbose:
+        logging.basicConfig(stream=sys.stderr, level=logging.DEBUG)
+    mortage = run(args)
+
+    text = format_summary(summarize(mortage), args.format)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if args.history:
+        from output import open_writer
+
+        history = mortage._history_buffer
+        with open_writer(args.history, history.columns) as writer:
+            writer.write_columns({name: history.column(name) for name in history.columns})
+
+    if args.history_table:
+        print(mortage._history.head(50))
+
+    if args.plot is not None:
+        from main import plot_history
+        plot_history(mortage, args.plot or None)
+
+
+if __name__ == '__main__':
+    main()
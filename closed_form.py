@@ -0,0 +1,167 @@
+import math
+
+import numpy as np
+
+from cache import annuity_factor
+from expenses import ExpenseCalendar
+from schedule import AmortizationSchedule
+
+
+def _pagos_completos(saldo:float, cuota:float, interes_mensual:float) -> float:
+    """
+    Número de cuotas completas que se pagan desde `saldo` antes de que la cuota supere lo pendiente.
+
+    Una cuota es completa mientras saldo * (1 + i) >= cuota (en `simulacion_hipoteca`, amortizacion_mes <= saldo).
+    Entre amortizaciones extraordinarias el saldo sigue la recurrencia de la anualidad:
+        saldo_j = cuota / i - (cuota / i - saldo) * (1 + i) ** j
+    Devuelve math.inf si la cuota no cubre los intereses y el saldo nunca baja.
+    """
+    if saldo * (1 + interes_mensual) < cuota:
+        return 0
+    if interes_mensual == 0:
+        return math.floor(saldo / cuota)
+    limite = cuota / interes_mensual
+    if cuota <= saldo * interes_mensual:
+        return math.inf
+    ratio = (limite - cuota / (1 + interes_mensual)) / (limite - saldo)
+    return math.floor(math.log(ratio) / math.log1p(interes_mensual)) + 1
+
+
+def _saldo_tras(saldo, cuota:float, interes_mensual:float, pagos):
+    """
+    Saldo después de `pagos` cuotas completas (admite arrays de pagos).
+    """
+    if interes_mensual == 0:
+        return saldo - pagos * cuota
+    factor = (1 + interes_mensual) ** pagos
+    return saldo * factor - cuota * (factor - 1) / interes_mensual
+
+
+class SimulacionAnalitica:
+    """
+    Simulación de `simulacion_hipoteca` que salta de amortización extraordinaria en amortización extraordinaria.
+
+    Entre dos amortizaciones la cuota es constante y el saldo sigue la fórmula cerrada de la anualidad, así que
+    el resumen (saldo, intereses, número de pagos y última cuota) se obtiene en O(amortizaciones) en lugar de
+    O(meses). El detalle mensual solo se construye si se pide con `detalle()`.
+
+    Args:
+        Los mismos que `simulacion_hipoteca` para el préstamo, las vinculaciones y las amortizaciones.
+    """
+
+    def __init__(self, capital, interes_anual, plazo_anos, seguro_vida=0, seguro_vivienda=0, alarma=0,
+                 amortizaciones_extraordinarias=None, comision_amortizacion=0, gastos=None):
+        calendario = AmortizationSchedule.compile(amortizaciones_extraordinarias)
+        self.interes_mensual = interes_mensual = (interes_anual / 100) / 12
+        self.num_pagos = num_pagos = plazo_anos * 12
+        self.costes_fijos = seguro_vida + seguro_vivienda + alarma
+        self.calendario_gastos = ExpenseCalendar(gastos, num_pagos)
+        self.cuota_inicial = cuota = capital / annuity_factor(interes_mensual, num_pagos)
+        factor_comision = 1 + comision_amortizacion / 100
+
+        # tramos de cuota constante: (primer mes, saldo al empezarlo, cuota, cuotas completas, hay pago final)
+        self.tramos = []
+        saldo = capital
+        pagado = intereses = 0
+        pagado_primer_ano = None
+        fronteras = sorted({mes for mes in calendario.meses if mes <= num_pagos} | {13, num_pagos + 1})
+        mes = 1
+        terminado = False
+        for frontera in fronteras:
+            if frontera <= mes:
+                continue
+            if mes == 13:
+                pagado_primer_ano = pagado
+
+            amort_extra_mes = calendario.get(mes)
+            if amort_extra_mes:
+                saldo -= amort_extra_mes['monto'] * factor_comision
+                if amort_extra_mes['tipo'] == 'cuota':
+                    cuota = saldo / annuity_factor(interes_mensual, num_pagos - mes + 1)
+
+            meses = min(frontera, num_pagos + 1) - mes
+            completos = min(meses, _pagos_completos(saldo, cuota, interes_mensual))
+            final = completos < meses
+            self.tramos.append((mes, saldo, cuota, completos, final))
+
+            saldo_tras = _saldo_tras(saldo, cuota, interes_mensual, completos)
+            pagado += completos * cuota
+            intereses += completos * cuota - (saldo - saldo_tras)
+            saldo = saldo_tras
+            mes += completos
+
+            if final:
+                # última cuota: se paga todo el saldo pendiente
+                intereses += saldo * interes_mensual
+                cuota = saldo * (1 + interes_mensual)
+                pagado += cuota
+                saldo = 0
+                mes += 1
+                terminado = True
+            elif saldo <= 0:
+                terminado = True
+            if terminado or mes > num_pagos:
+                break
+
+        self.meses = mes - 1
+        if pagado_primer_ano is None or self.meses < 12:
+            pagado_primer_ano = pagado
+        self.cuota_final = cuota
+        self.saldo_final = max(saldo, 0)
+        self.intereses_totales = intereses
+        self.pagado = pagado
+        self._costes_primer_ano = self.costes_fijos * min(12, self.meses) + self.calendario_gastos.total(min(12, self.meses))
+        self._costes = self.costes_fijos * self.meses + self.calendario_gastos.total(self.meses)
+        self._pagado_primer_ano = pagado_primer_ano
+
+    def resumen(self) -> dict:
+        """
+        Los resultados de `simulacion_hipoteca` más el saldo final, los intereses pagados y el número de pagos.
+        """
+        return {
+            "Cuota Mensual Base": round(self.cuota_final, 2),
+            "Cuota Mensual Total": round(self.cuota_inicial + self.costes_fijos + self.calendario_gastos.month_total(1), 2),
+            "Total Anual": round(self._pagado_primer_ano + self._costes_primer_ano, 2),
+            "Total Pagado": round(self.pagado + self._costes, 2),
+            "Saldo Restante": round(self.saldo_final, 2),
+            "Intereses Totales": round(self.intereses_totales, 2),
+            "Num Pagos": self.meses
+        }
+
+    def saldo(self, mes:int) -> float:
+        """
+        Saldo pendiente al final de un mes, calculado con la fórmula cerrada de su tramo.
+        """
+        if mes >= self.meses:
+            return self.saldo_final
+        for inicio, saldo, cuota, completos, final in reversed(self.tramos):
+            if inicio <= mes:
+                return max(_saldo_tras(saldo, cuota, self.interes_mensual, mes - inicio + 1), 0)
+        return self.tramos[0][1] if self.tramos else 0
+
+    def detalle(self) -> dict:
+        """
+        Arrays mensuales de amortización, intereses, saldo y cuota, iguales a las columnas de `simulacion_hipoteca`.
+        """
+        amortizacion = np.zeros(self.meses)
+        intereses = np.zeros(self.meses)
+        saldos = np.zeros(self.meses)
+
+        for inicio, saldo, cuota, completos, final in self.tramos:
+            pagos = np.arange(completos + 1)
+            saldos_tramo = _saldo_tras(saldo, cuota, self.interes_mensual, pagos)
+            meses = slice(inicio - 1, inicio - 1 + completos)
+            intereses[meses] = saldos_tramo[:-1] * self.interes_mensual
+            amortizacion[meses] = cuota - intereses[meses]
+            saldos[meses] = np.maximum(saldos_tramo[1:], 0)
+            if final:
+                intereses[inicio - 1 + completos] = saldos_tramo[-1] * self.interes_mensual
+                amortizacion[inicio - 1 + completos] = saldos_tramo[-1]
+
+        costes = self.costes_fijos + self.calendario_gastos.totals[:self.meses]
+        return {
+            'Amortización': amortizacion,
+            'Intereses': intereses,
+            'Saldo Restante': saldos,
+            'Cuota': amortizacion + intereses + costes,
+        }
@@ -0,0 +1,110 @@
+import numpy as np
+
+# months between payments of the named frequencies
+FREQUENCIES = {'monthly': 1, 'quarterly': 3, 'yearly': 12}
+
+
+class Expense:
+    """
+    Expense related to a mortage (insurance, alarm...) and when it is charged.
+
+    Args:
+        name (str): Name of the expense.
+        value (float): Amount of each payment.
+        frequency (str | int): 'monthly', 'quarterly', 'yearly', 'once' for a one-off charge, or the months between payments.
+        start (int, optional): First month charged. Defaults to the end of the first period (month 1 for 'monthly'
+            and 'once', month 3 for 'quarterly', month 12 for 'yearly').
+        end (int, optional): Last month that can be charged. Charges also stop when the loan is repaid.
+        indexation (float, optional): Yearly increase of the amount (0.02 for 2%), applied every 12 months from `start`.
+    """
+
+    def __init__(self, name:str, value:float, frequency='monthly', start:int=None, end:int=None, indexation:float=0):
+        if frequency == 'once':
+            period = None
+        elif isinstance(frequency, str):
+            if frequency not in FREQUENCIES:
+                raise ValueError(f"Unknown frequency {frequency!r}, expected one of {sorted(FREQUENCIES)}, 'once' or a number of months")
+            period = FREQUENCIES[frequency]
+        else:
+            period = int(frequency)
+            if period < 1:
+                raise ValueError(f"The period of an expense must be at least one month, not {frequency!r}")
+
+        self.name = name
+        self.value = value
+        self.frequency = frequency
+        self.period = period
+        self.start = start if start is not None else (period or 1)
+        self.end = end
+        self.indexation = indexation
+
+    def amounts(self, months:int) -> np.ndarray:
+        """
+        Amount charged each month, position 0 being month 1.
+        """
+        amounts = np.zeros(months)
+        last = months if self.end is None else min(self.end, months)
+        if self.start > last:
+            return amounts
+
+        charged = np.array([self.start]) if self.period is None else np.arange(self.start, last + 1, self.period)
+        years = (charged - self.start) // 12
+        amounts[charged - 1] = self.value * (1 + self.indexation) ** years
+        return amounts
+
+    def to_dict(self) -> dict:
+        return {'name': self.name, 'value': self.value, 'frequency': self.frequency,
+                'start': self.start, 'end': self.end, 'indexation': self.indexation}
+
+    def __getitem__(self, key):
+        # Mortage.get_related_expense used to return a dict with 'name', 'value' and 'frequency'
+        return self.to_dict()[key]
+
+    def __repr__(self):
+        return f"Expense({self.to_dict()!r})"
+
+
+class ExpenseCalendar:
+    """
+    Month x expense matrix of the related expenses, built once so the simulators read it in O(1) per month.
+    """
+
+    def __init__(self, expenses, months:int):
+        self.expenses = [e if isinstance(e, Expense) else Expense(**e) for e in expenses or []]
+        self.names = [e.name for e in self.expenses]
+        self.months = months
+        self.matrix = np.zeros((months, len(self.expenses)))
+        for i, expense in enumerate(self.expenses):
+            self.matrix[:, i] = expense.amounts(months)
+        self.totals = self.matrix.sum(axis=1)
+
+        # (name, amount) of the expenses charged each month
+        rows, columns = np.nonzero(self.matrix)
+        self._charges = [[] for _ in range(months)]
+        for row, column in zip(rows.tolist(), columns.tolist()):
+            self._charges[row].append((self.names[column], float(self.matrix[row, column])))
+
+    def month_total(self, month:int) -> float:
+        """
+        Total charged in a month (1 is the first month).
+        """
+        if 1 <= month <= self.months:
+            return float(self.totals[month - 1])
+        return 0.0
+
+    def charges(self, month:int) -> list:
+        """
+        (name, amount) of the expenses charged in a month.
+        """
+        if 1 <= month <= self.months:
+            return self._charges[month - 1]
+        return []
+
+    def total(self, months:int) -> float:
+        """
+        Total charged during the first `months` months.
+        """
+        return float(self.totals[:months].sum())
+
+    def to_dict(self) -> dict:
+        return {'expenses': [e.to_dict() for e in self.expenses], 'months': self.months}
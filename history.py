@@ -0,0 +1,88 @@
+import numpy as np
+
+
+class HistoryBuffer:
+    """
+    Columnar store for the movements of a mortage.
+
+    Columns are preallocated arrays written in place, so appending a row is O(1).
+    The pandas DataFrame is only built (and pandas imported) when the history is read.
+    """
+    columns = ['debt', 'time', 'amortization', 'interest', 'payment', 'type', 'frequency']
+    _numeric = ('debt', 'amortization', 'interest', 'payment')
+    _labels = ('time', 'type', 'frequency')
+
+    def __init__(self, capacity:int=0):
+        capacity = max(int(capacity), 1)
+        self._size = 0
+        self._columns = {name: np.empty(capacity, dtype=float) for name in self._numeric}
+        self._columns.update({name: np.empty(capacity, dtype=object) for name in self._labels})
+        self._frame = None
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def capacity(self):
+        return len(self._columns['debt'])
+
+    def reserve(self, capacity:int):
+        """
+        Makes room for at least `capacity` rows keeping the rows already written.
+        """
+        if capacity <= self.capacity:
+            return
+        for name, column in self._columns.items():
+            resized = np.empty(capacity, dtype=column.dtype)
+            resized[:self._size] = column[:self._size]
+            self._columns[name] = resized
+
+    def append(self, debt, time, amortization, interest, payment, type, frequency):
+        if self._size == self.capacity:
+            self.reserve(2 * self.capacity)
+
+        i = self._size
+        columns = self._columns
+        columns['debt'][i] = debt
+        columns['time'][i] = time
+        columns['amortization'][i] = amortization
+        columns['interest'][i] = interest
+        columns['payment'][i] = payment
+        columns['type'][i] = type
+        columns['frequency'][i] = frequency
+        self._size += 1
+        self._frame = None
+
+    def truncate(self, size:int):
+        """
+        Drops the rows after the first `size`, keeping the columns allocated.
+        """
+        if size < self._size:
+            self._size = size
+            self._frame = None
+
+    def copy(self) -> 'HistoryBuffer':
+        """
+        Independent buffer with the rows written, with no spare capacity.
+        """
+        copy = HistoryBuffer.__new__(HistoryBuffer)
+        copy._size = self._size
+        copy._columns = {name: column[:max(self._size, 1)].copy() for name, column in self._columns.items()}
+        copy._frame = None
+        return copy
+
+    def column(self, name):
+        """
+        Returns a read-only view of the rows written in a column, without building a DataFrame.
+        """
+        view = self._columns[name][:self._size]
+        view.flags.writeable = False
+        return view
+
+    def to_frame(self):
+        if self._frame is None:
+            import pandas as pd
+
+            self._frame = pd.DataFrame({name: self._columns[name][:self._size].copy() for name in self.columns},
+                                       columns=self.columns)
+        return self._frame
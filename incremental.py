@@ -0,0 +1,128 @@
+import numpy as np
+
+from cache import annuity_factor
+from expenses import ExpenseCalendar
+from schedule import AmortizationSchedule
+
+
+class SimulacionIncremental:
+    """
+    Simulación de `simulacion_hipoteca` que se puede editar sin volver a empezar desde el mes 1.
+
+    Cada `intervalo_checkpoint` meses se guarda el estado (saldo, cuota base y total pagado). Al añadir,
+    cambiar o eliminar una amortización extraordinaria del mes k solo se recalcula desde el último
+    checkpoint anterior a k; los meses previos se conservan en los mismos arrays, sin copiarlos.
+
+    Args:
+        Los mismos que `simulacion_hipoteca` para el préstamo, las vinculaciones y las amortizaciones.
+        intervalo_checkpoint (int): Meses entre checkpoints, 0 para guardar solo el inicial.
+    """
+
+    def __init__(self, capital, interes_anual, plazo_anos, seguro_vida=0, seguro_vivienda=0, alarma=0,
+                 amortizaciones_extraordinarias=None, comision_amortizacion=0, gastos=None, intervalo_checkpoint=12):
+        # copia del calendario para que las ediciones no modifiquen el del llamante
+        self.calendario = AmortizationSchedule.compile_copy(amortizaciones_extraordinarias)
+        self.capital = capital
+        self.interes_mensual = (interes_anual / 100) / 12
+        self.num_pagos = plazo_anos * 12
+        self.comision_amortizacion = comision_amortizacion
+        self.intervalo_checkpoint = intervalo_checkpoint
+
+        self.costes = seguro_vida + seguro_vivienda + alarma + ExpenseCalendar(gastos, self.num_pagos).totals
+        self.cuota_inicial = capital / annuity_factor(self.interes_mensual, self.num_pagos)
+
+        self.amortizacion = np.zeros(self.num_pagos)
+        self.intereses = np.zeros(self.num_pagos)
+        self.saldos = np.zeros(self.num_pagos)
+        self.cuotas = np.zeros(self.num_pagos)
+
+        self._checkpoints = {}  # mes -> (saldo restante, cuota mensual base, total pagado) al empezar el mes
+        self._meses = 0
+        self._cuota_mensual_base = self.cuota_inicial
+        self._total_pagado = 0
+        self.meses_recalculados = 0
+        self._simular_desde(1)
+
+    def anadir_amortizacion(self, mes:int, monto:float, tipo:str='plazo'):
+        self.calendario.add(mes, monto, tipo, keep_duplicate=True)
+        self._simular_desde(mes)
+
+    def eliminar_amortizacion(self, mes:int):
+        self.calendario.remove(mes)
+        self._simular_desde(mes)
+
+    def cambiar_amortizacion(self, mes:int, monto:float, tipo:str='plazo'):
+        self.calendario.replace(mes, monto, tipo)
+        self._simular_desde(mes)
+
+    def _simular_desde(self, mes_editado:int):
+        if mes_editado > self._meses and self._meses > 0 and self.saldos[self._meses - 1] <= 0:
+            # el préstamo ya estaba amortizado antes de ese mes
+            return
+
+        inicio = max((m for m in self._checkpoints if m <= mes_editado), default=1)
+        if inicio == 1:
+            saldo_restante, cuota_mensual_base, total_pagado = self.capital, self.cuota_inicial, 0
+        else:
+            saldo_restante, cuota_mensual_base, total_pagado = self._checkpoints[inicio]
+        self._checkpoints = {m: estado for m, estado in self._checkpoints.items() if m <= inicio}
+
+        interes_mensual = self.interes_mensual
+        factor_comision = 1 + self.comision_amortizacion / 100
+        mes = inicio - 1
+        for mes in range(inicio, self.num_pagos + 1):
+            if mes == 1 or (self.intervalo_checkpoint and (mes - 1) % self.intervalo_checkpoint == 0):
+                self._checkpoints[mes] = (saldo_restante, cuota_mensual_base, total_pagado)
+
+            amort_extra_mes = self.calendario.get(mes)
+            if amort_extra_mes:
+                saldo_restante -= amort_extra_mes['monto'] * factor_comision
+                if amort_extra_mes['tipo'] == 'cuota':
+                    cuota_mensual_base = saldo_restante / annuity_factor(interes_mensual, self.num_pagos - mes + 1)
+
+            interes_mes = saldo_restante * interes_mensual
+            amortizacion_mes = cuota_mensual_base - interes_mes
+
+            # Evitar saldo negativo
+            if saldo_restante < amortizacion_mes:
+                amortizacion_mes = saldo_restante
+                cuota_mensual_base = interes_mes + amortizacion_mes
+
+            saldo_restante -= amortizacion_mes
+            cuota_actual = amortizacion_mes + interes_mes + self.costes[mes - 1]
+
+            self.amortizacion[mes - 1] = amortizacion_mes
+            self.intereses[mes - 1] = interes_mes
+            self.saldos[mes - 1] = saldo_restante if saldo_restante > 0 else 0
+            self.cuotas[mes - 1] = cuota_actual
+            total_pagado += cuota_actual
+
+            if saldo_restante <= 0:
+                break
+
+        self.meses_recalculados += mes - inicio + 1
+        self._meses = mes
+        self._cuota_mensual_base = cuota_mensual_base
+        self._total_pagado = total_pagado
+
+    def resumen(self) -> dict:
+        """
+        Los mismos resultados que devuelve `simulacion_hipoteca`.
+        """
+        return {
+            "Cuota Mensual Base": round(self._cuota_mensual_base, 2),
+            "Cuota Mensual Total": round(self.cuota_inicial + float(self.costes[0]), 2),
+            "Total Anual": round(float(sum(self.cuotas[:min(12, self._meses)].tolist())), 2),
+            "Total Pagado": round(self._total_pagado, 2)
+        }
+
+    def detalle(self) -> dict:
+        """
+        Vistas (sin copia) de los arrays mensuales de los meses simulados.
+        """
+        return {
+            'Amortización': self.amortizacion[:self._meses],
+            'Intereses': self.intereses[:self._meses],
+            'Saldo Restante': self.saldos[:self._meses],
+            'Cuota': self.cuotas[:self._meses],
+        }
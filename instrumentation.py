@@ -0,0 +1,76 @@
+import contextlib
+import logging
+import threading
+import time
+from collections import defaultdict
+
+logger = logging.getLogger('mortage')
+logger.addHandler(logging.NullHandler())
+
+_NO_PHASE = contextlib.nullcontext()
+
+
+class Instrumentation:
+    """
+    Counters, per-phase timers and hooks of a simulation.
+
+    Hooks are callables hook(event, **data) called for every event emitted, so a profiler or a metrics
+    exporter can follow the simulation. Events emitted by Mortage.simulate are 'month' (month, debt),
+    'extra_amortization' (month, amount, type) and 'phase' (name, seconds).
+
+    One instance can be shared by mortages simulated in several threads; hooks are then called from those threads.
+    """
+
+    def __init__(self, timers:bool=True):
+        self.timers_enabled = timers
+        self.counters = defaultdict(int)
+        self.timers = defaultdict(float)
+        self._hooks = []
+        self._lock = threading.Lock()
+
+    def add_hook(self, hook):
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook):
+        self._hooks.remove(hook)
+
+    def count(self, name:str, value:int=1):
+        with self._lock:
+            self.counters[name] += value
+
+    def emit(self, event:str, **data):
+        for hook in self._hooks:
+            hook(event, **data)
+
+    def phase(self, name:str):
+        """
+        Context manager adding the time spent inside it to the timer `name`.
+        """
+        if not self.timers_enabled:
+            return _NO_PHASE
+        return self._timed(name)
+
+    @contextlib.contextmanager
+    def _timed(self, name:str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.timers[name] += elapsed
+            if self._hooks:
+                self.emit('phase', name=name, seconds=elapsed)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {'counters': dict(self.counters), 'timers': dict(self.timers)}
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.timers.clear()
+
+
+def no_phase(name:str):
+    return _NO_PHASE
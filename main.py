@@ -1,81 +1,168 @@
-import pandas as pd
-import matplotlib.pyplot as plt
 import math
 
+import numpy as np
+
+from cache import annuity_factor
+from expenses import Expense, ExpenseCalendar
+from history import HistoryBuffer
+from instrumentation import logger, no_phase
+from schedule import AmortizationSchedule
+
+# amortization type of Mortage for each 'tipo' of the extra amortization schedule
+EXTRA_AMORTIZATION_TYPES = {'cuota': 'extra_payment', 'plazo': 'extra_term'}
 
 
 class Mortage:
-    _capital = 0
-    _debt = 0
-    _interest_rate = 0 #percentage of interest
-    _monthly_interest_rate = 0
-    _total_interests = 0
-    _term_years = 0
-    _term = 0 #months
-    _monthly_payment = 0
-
-    _related_expenses = {}
-    _history = None
-
-    _bank_data = {}
-    
+    """
+    State of a mortage and its simulation.
+
+    All the state is per instance (slots, no shared class attributes), so many mortages can be simulated
+    at the same time from a thread pool. clone() forks a mortage cheaply to try other scenarios.
+    """
+    __slots__ = ('_capital', '_debt', '_interest_rate', '_monthly_interest_rate', '_total_interests',
+                 '_term_years', '_term', '_monthly_payment',
+                 '_related_expenses', '_expense_calendar', '_history_buffer', '_bank_data',
+                 '_variable_rate', '_instrumentation',
+                 '_schedule', '_amortization_interest', '_checkpoint_every', '_checkpoints', '_last_month')
+
     def __init__(self, capital=0, interest=0, term = 0):
         self._capital = capital
         self._debt = capital
-        self._interest_rate = interest/100
+        self._interest_rate = interest/100 #percentage of interest
         self._monthly_interest_rate = self._interest_rate/12
+        self._total_interests = 0
         self._term_years = term
-        self._term = term * 12
+        self._term = term * 12 #months
 
-        self._history = pd.DataFrame(columns=['debt', 'time', 'amortization', 'interest', 'payment', 'type', 'frequency'])
+        self._related_expenses = {}
+        self._expense_calendar = None
+        self._history_buffer = HistoryBuffer(self._term)
+        self._bank_data = {}
+        self._variable_rate = None
+        self._instrumentation = None
 
+        self._schedule = None
+        self._amortization_interest = 0
+        self._checkpoint_every = 12
+        self._checkpoints = None
+        self._last_month = 0
 
         self._monthly_payment = self.calculate_monthly_amortization()        
-        self._toString()
+        logger.debug("%s", self)
+
+    def clone(self) -> 'Mortage':
+        """
+        Independent copy of the mortage, with its expenses, bank data, history and checkpoints.
+
+        Expenses, the expense calendar and the checkpoints are not modified once created, so they are shared;
+        only the containers and the history columns are copied. The instrumentation is shared too.
+        """
+        clone = Mortage.__new__(Mortage)
+        for name in Mortage.__slots__:
+            setattr(clone, name, getattr(self, name))
+        clone._related_expenses = dict(self._related_expenses)
+        clone._bank_data = dict(self._bank_data)
+        clone._history_buffer = self._history_buffer.copy()
+        if self._variable_rate is not None:
+            clone._variable_rate = dict(self._variable_rate)
+        if self._schedule is not None:
+            clone._schedule = self._schedule.copy()
+        if self._checkpoints is not None:
+            clone._checkpoints = dict(self._checkpoints)
+        return clone
+
+    @property
+    def _history(self):
+        return self._history_buffer.to_frame()
+
+    def _reserve_history(self):
+        # one row per month and related expense plus room for some extra amortizations
+        rows = math.ceil(self._term_years * 12) * (1 + len(self._related_expenses)) + 12
+        self._history_buffer.reserve(len(self._history_buffer) + rows)
+
+    def set_instrumentation(self, instrumentation):
+        """
+        Attaches an Instrumentation that counts, times and reports the events of the simulation.
+        """
+        self._instrumentation = instrumentation
 
     def set_bank_data(self,**kwargs):
         for k,v in kwargs.items():
             self._bank_data[k]=v
 
-    def add_related_expense(self, name:str='', value:int=0, frequency:str='monthly', **kwargs):
-        expense = {
-            'name': name,
-            'value':value,
-            'frequency':frequency,
-            'last_payment':0
-        }
-        self._related_expenses[name] = expense
+    def add_related_expense(self, name:str='', value:int=0, frequency='monthly', start:int=None, end:int=None, indexation:float=0, **kwargs):
+        """
+        Adds an expense related to the mortage (see expenses.Expense for the arguments).
+        """
+        self._related_expenses[name] = Expense(name, value, frequency, start, end, indexation)
+        self._expense_calendar = None
+        self._reserve_history()
 
     def get_related_expense(self, name):
-        print(self._related_expenses)
         return self._related_expenses[name]
-    
-    def pay_related_expenses(self, time):
-        for name,expense in self._related_expenses.items():
-            
-            print(name)
-            print(expense)
-            print(expense['frequency'])
-            if (expense['frequency'] == 'yearly' and expense['last_payment'] == 11) or \
-                (expense['frequency'] == 'quarterly' and expense['last_payment'] == 3) or \
-                expense['frequency'] == 'monthly':
-                self.related_expense_payment(name, time)
-                expense['last_payment'] = 0
-
-            expense['last_payment'] +=1
-
-
-    def related_expense_payment(self, name, time):
-        print(f"-- related_expense_payment: {name}")
+
+    def expense_calendar(self) -> ExpenseCalendar:
+        """
+        Month x expense calendar of the related expenses over the term, built once.
+        """
+        if self._expense_calendar is None:
+            self._expense_calendar = ExpenseCalendar(self._related_expenses.values(), math.ceil(self._term_years * 12))
+        return self._expense_calendar
+
+    def pay_related_expenses(self, time, month:int):
+        for name, value in self.expense_calendar().charges(month):
+            self.related_expense_payment(name, time, value)
+
+
+    def related_expense_payment(self, name, time, value:float=None):
         expense = self.get_related_expense(name)
-        print(expense)
-        self._history = self._history._append({'debt': self._debt, 
-                                                  'time': time, 
-                                                  'amortization':0, 
-                                                  'interest': 0,
-                                                  'payment':expense['value'],
-                                                  'type':'extra_expense',
-                                                  'frequency':expense['name']}, ignore_index=True)
+        logger.debug("related_expense_payment %s: %s", time, expense)
+        self._history_buffer.append(debt=self._debt,
+                                    time=time,
+                                    amortization=0,
+                                    interest=0,
+                                    payment=expense.value if value is None else value,
+                                    type='extra_expense',
+                                    frequency=expense.name)
+
+    def set_variable_rate(self, reference_index, spread:float, revision_months:int=12, floor:float=None, cap:float=None):
+        """
+        Makes the interest variable: every `revision_months` the interest is revised to the reference index plus
+        the spread, limited by the floor and the cap. The interest of the constructor applies until the first revision.
+
+        Args:
+            reference_index (list | callable): Annual value of the index in percentage for each month
+                (position 0 is month 1), or a function returning it for a month.
+            spread (float): Spread over the index in percentage.
+            revision_months (int, optional): Months between revisions. Defaults to 12.
+            floor (float, optional): Minimum annual interest in percentage.
+            cap (float, optional): Maximum annual interest in percentage.
+        """
+        self._variable_rate = {
+            'reference_index': reference_index,
+            'spread': spread,
+            'revision_months': revision_months,
+            'floor': floor,
+            'cap': cap
+        }
+
+    def revise_interest_rate(self, month:int):
+        """
+        Sets the interest of the variable rate for a month and recalculates the monthly payment for the remaining term.
+        """
+        variable_rate = self._variable_rate
+        reference_index = variable_rate['reference_index']
+        index = reference_index(month) if callable(reference_index) else reference_index[month - 1]
+
+        interest = index + variable_rate['spread']
+        if variable_rate['floor'] is not None:
+            interest = max(interest, variable_rate['floor'])
+        if variable_rate['cap'] is not None:
+            interest = min(interest, variable_rate['cap'])
+
+        self._interest_rate = interest/100
+        self._monthly_interest_rate = self._interest_rate/12
+        self._monthly_payment = self.calculate_monthly_amortization()
 
     def calculate_monthly_amortization(self):
         """
@@ -84,7 +171,7 @@ class Mortage:
         Returns:
         - Monthly amortization (monthly payment).
         """
-        monthly_payment = self._debt * (self._monthly_interest_rate * (1 + self._monthly_interest_rate) ** self._term) / ((1 + self._monthly_interest_rate) ** self._term - 1)
+        monthly_payment = self._debt / annuity_factor(self._monthly_interest_rate, self._term)
         return monthly_payment
 
 
@@ -146,13 +233,13 @@ class Mortage:
             self._monthly_payment = self.calculate_monthly_amortization()
         
 
-        self._history = self._history._append({'debt': self._debt, 
-                                                  'time': time, 
-                                                  'amortization':amortization, 
-                                                  'interest':interest,
-                                                  'payment':payment,
-                                                  'type':type,
-                                                  'frequency':frequency}, ignore_index=True)
+        self._history_buffer.append(debt=self._debt,
+                                    time=time,
+                                    amortization=amortization,
+                                    interest=interest,
+                                    payment=payment,
+                                    type=type,
+                                    frequency=frequency)
 
         # if type=='monthly':
         #     interest = self._debt * self._monthly_interest_rate
@@ -200,74 +287,158 @@ class Mortage:
     
 
 
-    def simulate(self):
-        for y in range (0,self._term_years):
-            if M._debt <= 0:
-                break
-            # print(f"Year: {2025 + y}")
-            for m in range(0,12):
-                if M._debt <= 0:
-                    break
-                print(f"{2025 + y} - {m+1}")
-                M.amortization(self._monthly_payment, time=f"{2025 + y}-{m+1}")
-                if y in [2] and m == 11:
-                    M.amortization(10000, 0, 'extra_payment', time=f"{2025 + y}-{m+1}")
-                if y in [] and m == 11:
-                    M.amortization(10000, 0, 'extra_term', time=f"{2025 + y}-{m+1}")
-                M.pay_related_expenses(f"{2025 + y}-{m+1}")
-
-                
-            
-
-
-    def _toString(self):
-        print("Mortage:")
-        print(f" - Loan: {self._capital}")
-        print(f" - Debt: {self._debt}")
-        print(f" - Term: {self._term}")
-        print(f" - Interests: {self._total_interests}")
-        print(f" - Monthly amortization: {self._monthly_payment}")
-
-
-
-
-
-
-if __name__ == '__main__':
-    M = Mortage(378000, 2.1, 30)
-    M.set_bank_data(bank_name='Sabadell')
-    M.add_related_expense('seguro de vida', 266, 'quarterly')
-    # e = M.get_related_expense('seguro de vida')
-    # M.related_expense_payment('seguro de vida', '2025-12')
-
-    initial_debt, initial_interest = M.calculate_current_debt()
-    initial_term = M._term
+    def simulate(self, schedule=None, amortization_interest:float=0, checkpoint_every:int=12):
+        """
+        Simulates the mortage month by month applying the extra amortizations of the schedule.
 
-    M.simulate()
+        Every `checkpoint_every` months the state of the mortage is saved, so the extra amortizations can be
+        edited later with set_extra_amortization / remove_extra_amortization recomputing only from the
+        checkpoint before the edited month.
 
-    # total_cuotes = len(M._history[M._history]
-    # len(df.loc[df.A > 0]
+        Args:
+            schedule (AmortizationSchedule | list, optional): Extra amortizations by month ('mes', 'monto', 'tipo'),
+                'cuota' reduces the monthly payment and 'plazo' reduces the term.
+            amortization_interest (float, optional): Commission applied to the extra amortizations (0.005 for 0.5%).
+            checkpoint_every (int, optional): Months between checkpoints, 0 to keep only the initial one. Defaults to 12.
+        """
+        # own copy of the schedule, edits must not change the caller's one
+        self._schedule = AmortizationSchedule.compile_copy(schedule)
+        self._amortization_interest = amortization_interest
+        self._checkpoint_every = checkpoint_every
+        self._checkpoints = {}
+        self._run(1)
+
+    def set_extra_amortization(self, month:int, amount:float, type:str='plazo'):
+        """
+        Replaces the extra amortizations of a month and recomputes the simulation from the checkpoint before it.
+        """
+        self._schedule.replace(month, amount, type)
+        self._resimulate_from(month)
 
-    
-    print(M._history.head(50))
+    def add_extra_amortization(self, month:int, amount:float, type:str='plazo'):
+        """
+        Adds an extra amortization (merged with the ones of the same month) and recomputes from the checkpoint before it.
+        """
+        self._schedule.add(month, amount, type, keep_duplicate=True)
+        self._resimulate_from(month)
 
-    # print(M._history.head(40))
+    def remove_extra_amortization(self, month:int):
+        """
+        Removes the extra amortizations of a month and recomputes from the checkpoint before it.
+        """
+        self._schedule.remove(month)
+        self._resimulate_from(month)
+
+    def _checkpoint(self):
+        return (self._debt, self._term, self._monthly_payment, self._interest_rate, self._monthly_interest_rate,
+                len(self._history_buffer))
+
+    def _resimulate_from(self, month:int):
+        if self._checkpoints is None:
+            raise RuntimeError("simulate must be called before editing the extra amortizations")
+        if self._debt <= 0 and month > self._last_month:
+            # the debt was already repaid before the edited month
+            return
+
+        start = max(m for m in self._checkpoints if m <= month)
+        debt, term, monthly_payment, interest_rate, monthly_interest_rate, history_rows = self._checkpoints[start]
+        self._debt, self._term, self._monthly_payment = debt, term, monthly_payment
+        self._interest_rate, self._monthly_interest_rate = interest_rate, monthly_interest_rate
+        self._history_buffer.truncate(history_rows)
+        self._checkpoints = {m: checkpoint for m, checkpoint in self._checkpoints.items() if m <= start}
+        self._run(start)
+
+    def _run(self, first_month:int):
+        schedule = self._schedule
+        amortization_interest = self._amortization_interest
+        instrumentation = self._instrumentation
+        phase = instrumentation.phase if instrumentation else no_phase
+        history_rows = len(self._history_buffer)
+
+        with phase('simulate'):
+            for month in range(first_month, self._term_years * 12 + 1):
+                if self._debt <= 0:
+                    break
+                if month == 1 or (self._checkpoint_every and (month - 1) % self._checkpoint_every == 0):
+                    self._checkpoints[month] = self._checkpoint()
+
+                y, m = divmod(month - 1, 12)
+                time = f"{2025 + y}-{m+1}"
+                logger.debug("simulating %s", time)
+                if self._variable_rate and month > 1 and (month - 1) % self._variable_rate['revision_months'] == 0:
+                    self.revise_interest_rate(month)
+                with phase('amortization'):
+                    self.amortization(self._monthly_payment, time=time)
+                    extra = schedule.get(month)
+                    if extra:
+                        self.amortization(extra['monto'], amortization_interest, EXTRA_AMORTIZATION_TYPES[extra['tipo']], time=time)
+                with phase('related_expenses'):
+                    self.pay_related_expenses(time, month)
+                self._last_month = month
+
+                if instrumentation:
+                    instrumentation.count('months_simulated')
+                    instrumentation.emit('month', month=month, debt=self._debt)
+                    if extra:
+                        instrumentation.count('events_applied')
+                        instrumentation.emit('extra_amortization', month=month, amount=extra['monto'], type=extra['tipo'])
+
+        if instrumentation:
+            instrumentation.count('history_rows_written', len(self._history_buffer) - history_rows)
 
-    df = M._history[(M._history['type']=='monthly_amortization')]
 
-    summary = {
-        'total_pay':round(M._history['amortization'].sum() + M._history['interest'].sum(),2),
-        'total_interest':round(M._history['interest'].sum(),2),
-        'total_amortization':round(M._history['amortization'].sum(),2),
-        'num_cuotes': df['payment'].count(),
-        'initial_cuote': round(df['payment'][0:10].max(),2),
-        'last_cuotes':round(df['payment'][-15:-5].min(),2)
+    def _toString(self):
+        return (
+            "Mortage:\n"
+            f" - Loan: {self._capital}\n"
+            f" - Debt: {self._debt}\n"
+            f" - Term: {self._term}\n"
+            f" - Interests: {self._total_interests}\n"
+            f" - Monthly amortization: {self._monthly_payment}"
+        )
+
+    def __str__(self):
+        return self._toString()
+
+
+
+def _rounded(values, reduce) -> float:
+    # short loans leave the slices empty: NaN, as pandas returned for them
+    return round(float(reduce(values)), 2) if len(values) else math.nan
+
+
+def summarize(mortage:Mortage) -> dict:
+    """
+    Summary of a simulated mortage, computed from the history columns without building a DataFrame.
+    """
+    history = mortage._history_buffer
+    amortization = history.column('amortization')
+    interest = history.column('interest')
+    monthly_payments = history.column('payment')[history.column('type') == 'monthly_amortization']
+
+    return {
+        'total_pay': round(float(amortization.sum() + interest.sum()), 2),
+        'total_interest': round(float(interest.sum()), 2),
+        'total_amortization': round(float(amortization.sum()), 2),
+        'num_cuotes': int(len(monthly_payments)),
+        'initial_cuote': _rounded(monthly_payments[0:10], np.max),
+        'last_cuotes': _rounded(monthly_payments[-15:-5], np.min)
+    }
 
 
-    }
+def plot_history(mortage:Mortage, path:str=None):
+    """
+    Plots debt, payment, amortization and interest of the monthly amortizations with the summary.
 
+    Args:
+        mortage (Mortage): Simulated mortage.
+        path (str, optional): File where the chart is saved. If not given the chart is shown.
+    """
+    import matplotlib.pyplot as plt
 
-    
+    history = mortage._history
+    df = history[(history['type']=='monthly_amortization')]
+    summary = summarize(mortage)
 
     # Create the figure and axes
     fig, ax1 = plt.subplots(figsize=(10, 6))
@@ -285,24 +456,19 @@ if __name__ == '__main__':
     ax2.set_ylabel('Payment (€)', color='orange')
     ax2.tick_params(axis='y', labelcolor='orange')
 
-
-    # ax3 = ax1.twinx()
     ax2.plot(df['time'], df['amortization'], label='Amortization (€)', color='green', linestyle='--')
     ax2.plot(df['time'], df['interest'], label='Interest (€)', color='red', linestyle='--')
-    # ax3.set_ylabel('Amortization (€)', color='orange')
-    # ax3.tick_params(axis='y', labelcolor='orange')
 
     # Adjust x-axis labels
     ax1.set_xticks(df['time'][::12])  # Set fewer ticks
     ax1.set_xticklabels(df['time'][::12], rotation=45)  # Rotate labels
 
     # Add title and layout adjustments
-    plt.title(M._bank_data['bank_name'])
+    plt.title(mortage._bank_data.get('bank_name', ''))
 
     # Agregar resumen de resultados a la gráfica
     resumen = (
         f"Total pay: {summary['total_pay']:,.2f}€\n"
-        # f"Total Interest: {summary['total_interest']:,.2f}€\n"
         f"Total Interest: {summary['total_interest']:,.2f}€\n"
         f"Total amortization: {summary['total_amortization']:,.2f}€\n"
         f"Total monthyl payments: {summary['num_cuotes']}\n"
@@ -312,12 +478,13 @@ if __name__ == '__main__':
     plt.gcf().text(0.14, 0.17, resumen, fontsize=10, bbox=dict(facecolor='white', alpha=0.7))
     fig.tight_layout()  # Adjust layout to prevent overlap
 
-    # Show the plot
-    plt.show()
+    if path:
+        fig.savefig(path)
+        plt.close(fig)
+    else:
+        plt.show()
 
 
-    print(f"Total Interest: {summary['total_interest']}")
-    print(f"Total amortization: {summary['total_amortization']}")
-    print(f"Total monthyl payments: {summary['num_cuotes']}")
-    print(f"Initial cuote: {summary['initial_cuote']}")
-    print(f"Last cuote: {summary['last_cuotes']}")
\ No newline at end of file
+if __name__ == '__main__':
+    from cli import main
+    main()
@@ -1,7 +1,10 @@
-import matplotlib.pyplot as plt
-import csv
+from cache import annuity_factor
+from expenses import ExpenseCalendar
+from output import open_writer
+from schedule import AmortizationSchedule
 
-def simulacion_hipoteca(capital, interes_anual, plazo_anos, seguro_vida=0, seguro_vivienda=0, alarma=0, amortizaciones_extraordinarias=None, comision_amortizacion=0, titulo_grafica="Desglose de la cuota mensual: Amortización vs Intereses"):
+
+def simulacion_hipoteca(capital, interes_anual, plazo_anos, seguro_vida=0, seguro_vivienda=0, alarma=0, amortizaciones_extraordinarias=None, comision_amortizacion=0, titulo_grafica="Desglose de la cuota mensual: Amortización vs Intereses", salida=None, salida_resumen=None, cache=None, gastos=None):
     """
     Simula una hipoteca considerando capital, interés anual, plazo en años, vinculaciones adicionales,
     y amortizaciones extraordinarias con comisión.
@@ -13,18 +16,33 @@ def simulacion_hipoteca(capital, interes_anual, plazo_anos, seguro_vida=0, segur
         seguro_vida (float): Coste mensual del seguro de vida (opcional).
         seguro_vivienda (float): Coste mensual del seguro de vivienda (opcional).
         alarma (float): Coste mensual del servicio de alarma (opcional).
-        amortizaciones_extraordinarias (list): Lista de diccionarios donde cada uno contiene:
+        amortizaciones_extraordinarias (list | AmortizationSchedule): Lista de diccionarios donde cada uno contiene:
             - 'mes' (int): Mes en el que se realiza la amortización extraordinaria.
             - 'monto' (float): Monto de la amortización extraordinaria.
             - 'tipo' (str): 'cuota' para reducir cuota mensual, 'plazo' para reducir plazo.
+            También acepta un AmortizationSchedule ya compilado. Las amortizaciones de un mismo mes se suman.
         comision_amortizacion (float): Porcentaje de comisión sobre las amortizaciones extraordinarias.
         titulo_grafica (str): Título personalizado para la gráfica.
+        salida (str | writer): Destino del detalle mensual: None (por defecto) para no escribirlo, una ruta .csv,
+            .parquet o .npy, o un writer de output.py. Cada llamada debe usar su propia ruta.
+        salida_resumen (str | writer): Destino del resumen, con el mismo formato que `salida` (opcional).
+        cache (ResultCache): Caché de resultados (opcional). Un resultado de la caché no vuelve a escribir el
+            detalle, así que no se puede combinar con `salida` ni con `salida_resumen` (ValueError).
+        gastos (list): Vinculaciones con su propio calendario (Expense o diccionarios con sus argumentos), que se
+            suman a los costes mensuales de seguro_vida, seguro_vivienda y alarma (opcional).
 
     Returns:
         dict: Resultados de la simulación incluyendo pago mensual, total anual, y total al final del plazo.
     """
-    if amortizaciones_extraordinarias is None:
-        amortizaciones_extraordinarias = []
+    calendario = AmortizationSchedule.compile(amortizaciones_extraordinarias)
+
+    if cache is not None and (salida is not None or salida_resumen is not None):
+        raise ValueError("cache can not be combined with salida or salida_resumen: cached results do not write their output")
+    if cache is not None:
+        entradas = dict(capital=capital, interes_anual=interes_anual, plazo_anos=plazo_anos, seguro_vida=seguro_vida,
+                        seguro_vivienda=seguro_vivienda, alarma=alarma, amortizaciones_extraordinarias=calendario,
+                        comision_amortizacion=comision_amortizacion, gastos=gastos)
+        return cache.get_or_compute(entradas, lambda: simulacion_hipoteca(**entradas, salida=None))
 
     # Convertir la tasa de interés anual a mensual
     interes_mensual = (interes_anual / 100) / 12
@@ -33,13 +51,14 @@ def simulacion_hipoteca(capital, interes_anual, plazo_anos, seguro_vida=0, segur
     num_pagos = plazo_anos * 12
 
     # Cálculo de la cuota mensual usando la fórmula de anualidades
-    cuota_mensual_base = (capital * interes_mensual) / (1 - (1 + interes_mensual) ** -num_pagos)
+    cuota_mensual_base = capital / annuity_factor(interes_mensual, num_pagos)
 
     # Costes mensuales adicionales
-    costes_adicionales = seguro_vida + seguro_vivienda + alarma
+    costes_fijos = seguro_vida + seguro_vivienda + alarma
+    calendario_gastos = ExpenseCalendar(gastos, num_pagos)
 
     # Cuota mensual total
-    cuota_mensual_total = cuota_mensual_base + costes_adicionales
+    cuota_mensual_total = cuota_mensual_base + costes_fijos + calendario_gastos.month_total(1)
 
     # Generar los detalles de amortización mensual
     saldo_restante = capital
@@ -50,8 +69,11 @@ def simulacion_hipoteca(capital, interes_anual, plazo_anos, seguro_vida=0, segur
     vinculaciones = []
     total_pagado = 0
 
+    fieldnames = ['Mes', 'Amortización (€)', 'Intereses (€)', 'Saldo Restante (€)', 'Costes Vinculaciones (€)']
+    detalle = open_writer(salida, fieldnames)
+
     for mes in range(1, num_pagos + 1):
-        amort_extra_mes = next((amort for amort in amortizaciones_extraordinarias if amort['mes'] == mes), None)
+        amort_extra_mes = calendario.get(mes)
         if amort_extra_mes:
             monto_extra = amort_extra_mes['monto']
             comision = monto_extra * (comision_amortizacion / 100)
@@ -63,8 +85,9 @@ def simulacion_hipoteca(capital, interes_anual, plazo_anos, seguro_vida=0, segur
                 saldo_restante -= monto_total
                 # Recalcular cuota mensual base
                 num_pagos_restantes = num_pagos - mes + 1
-                cuota_mensual_base = (saldo_restante * interes_mensual) / (1 - (1 + interes_mensual) ** -num_pagos_restantes)
+                cuota_mensual_base = saldo_restante / annuity_factor(interes_mensual, num_pagos_restantes)
 
+        costes_adicionales = costes_fijos + calendario_gastos.month_total(mes)
         interes_mes = saldo_restante * interes_mensual
         amortizacion_mes = cuota_mensual_base - interes_mes
 
@@ -84,23 +107,12 @@ def simulacion_hipoteca(capital, interes_anual, plazo_anos, seguro_vida=0, segur
 
         total_pagado += cuota_actual
 
+        detalle.write_row((mes, round(amortizacion_mes, 2), round(interes_mes, 2), round(saldos[-1], 2), round(costes_adicionales, 2)))
+
         if saldo_restante <= 0:
             break
 
-    # Guardar resultados en un archivo CSV
-    with open('simulacion_hipoteca.csv', 'w', newline='') as csvfile:
-        fieldnames = ['Mes', 'Amortización (€)', 'Intereses (€)', 'Saldo Restante (€)', 'Costes Vinculaciones (€)']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-
-        writer.writeheader()
-        for mes in range(len(amortizacion)):
-            writer.writerow({
-                'Mes': mes + 1,
-                'Amortización (€)': round(amortizacion[mes], 2),
-                'Intereses (€)': round(intereses[mes], 2),
-                'Saldo Restante (€)': round(saldos[mes], 2),
-                'Costes Vinculaciones (€)': round(vinculaciones[mes], 2)
-            })
+    detalle.close()
 
     # Resultados anuales y totales
     total_anual = sum(cuota[:12]) if len(cuota) >= 12 else sum(cuota)
@@ -127,69 +139,41 @@ def simulacion_hipoteca(capital, interes_anual, plazo_anos, seguro_vida=0, segur
 
     # plt.show()
 
-    return {
+    resultados = {
         "Cuota Mensual Base": round(cuota_mensual_base, 2),
         "Cuota Mensual Total": round(cuota_mensual_total, 2),
         "Total Anual": round(total_anual, 2),
         "Total Pagado": round(total_pagado, 2)
     }
 
+    if salida_resumen is not None:
+        with open_writer(salida_resumen, list(resultados)) as resumen_writer:
+            resumen_writer.write_row(tuple(resultados.values()))
 
+    return resultados
 
-# Ejemplo de uso
-# amortizaciones = [
-#     {'mes': 24, 'monto': 10000, 'tipo': 'cuota'},  # Amortización extraordinaria en el mes 24 con reducción de cuota
-#     {'mes': 36, 'monto': 15000, 'tipo': 'cuota'},   # Amortización extraordinaria en el mes 36 con reducción de cuota
-#     {'mes': 48, 'monto': 15000, 'tipo': 'cuota'},   # Amortización extraordinaria en el mes 48 con reducción de cuota
-#     {'mes': 60, 'monto': 15000, 'tipo': 'cuota'},   # Amortización extraordinaria en el mes 48 con reducción de cuota
-# ]
-
-amortizaciones = []
 
-# data = simulacion_hipoteca(
-#     capital=378000,
-#     interes_anual=2.1,
-#     plazo_anos=30,
-#     seguro_vida=266/3,
-#     seguro_vivienda=641/12,
-#     alarma=55,
-#     amortizaciones_extraordinarias=amortizaciones,
-#     comision_amortizacion=0.5,
-#     titulo_grafica="Simulación de Hipoteca Sabadell con Ajustes"
-# )
 
-# print("Resultados de la simulación de hipoteca:")
-# for key, value in data.items():
-#     print(f"{key}: {value} €")
+if __name__ == '__main__':
+    # Ejemplo de uso
+    # amortizaciones = [
+    #     {'mes': 24, 'monto': 10000, 'tipo': 'cuota'},  # Amortización extraordinaria en el mes 24 con reducción de cuota
+    #     {'mes': 36, 'monto': 15000, 'tipo': 'cuota'},   # Amortización extraordinaria en el mes 36 con reducción de cuota
+    # ]
 
-resultados = []
-for i in range(0,30):
-    for j in range(0,30):
-        y = j+1
-        #'Yes' if fruit == 'Apple' else 'No'
+    from sweep import run_sweep
 
-        tipo = 'cuota' if y < i else 'plazo'
-
-        amortizaciones.append({'mes': 12 * y, 'monto': 10000, 'tipo': tipo})
-
-
-    # print(f"{amortizaciones}\n\n\n")
-
-    data = simulacion_hipoteca(
+    # Amortización anual de 10000 €: reducción de cuota hasta el año 'cambio_ano' y de plazo a partir de entonces
+    resultados = run_sweep(
+        {
+            'cambio_ano': range(0, 30),
+            'monto': 10000,
+            'frecuencia': 12,
+            'interes_anual': 2.1,
+            'plazo_anos': 30,
+            'comision_amortizacion': 0.5,
+        },
         capital=378000,
-        interes_anual=2.1,
-        plazo_anos=30,
-        seguro_vida=266/3,
-        seguro_vivienda=641/12,
-        alarma=55,
-        amortizaciones_extraordinarias=amortizaciones,
-        comision_amortizacion=0.5,
-        titulo_grafica="Simulación de Hipoteca Sabadell con Ajustes"
+        vinculaciones=266/3 + 641/12 + 55,
     )
-
-    
-    print(f"Variante: {i}")
-    print("Resultados de la simulación de hipoteca:")
-    for key, value in data.items():
-        print(f"{key}: {value} €")
-    print("#############################################")
\ No newline at end of file
+    print(resultados.to_string())
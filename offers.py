@@ -0,0 +1,159 @@
+"""
+Comparison of mortage offers by their effective annual rate (TAE).
+
+    compare_offers([
+        {'bank_name': 'Sabadell', 'interes_anual': 2.1, 'seguro_vida': 266/3, 'seguro_vivienda': 641/12, 'alarma': 55},
+        {'bank_name': 'Otro', 'interes_anual': 2.6, 'comision_amortizacion': 0},
+    ], capital=378000, plazo_anos=30)
+
+Every offer is simulated at once with simulacion_hipoteca_lote and the monthly internal rate of return of
+all the cash flow vectors is solved together, so comparing thousands of offers takes milliseconds.
+"""
+import numpy as np
+import pandas as pd
+
+from batch import matriz_amortizaciones, simulacion_hipoteca_lote
+from expenses import ExpenseCalendar
+
+# Parameters of an offer and their default values
+OFFER_DEFAULTS = {
+    'bank_name': '',
+    'interes_anual': 2.1,
+    'seguro_vida': 0,
+    'seguro_vivienda': 0,
+    'alarma': 0,
+    'comision_amortizacion': 0,
+    'gastos': None,                 # related expenses with their own calendar, as in simulacion_hipoteca
+}
+
+
+def irr(principal, cash_flows, guess=None, tolerance:float=1e-12, max_iterations:int=50):
+    """
+    Monthly internal rate of return of many loans at once.
+
+    Solves principal = sum(cash_flows[:, t] / (1 + r) ** (t + 1)) for every row with Newton's method and
+    falls back to bisection for the rows where it does not converge.
+
+    Args:
+        principal (array): Amount received at month 0 of each loan.
+        cash_flows (array): Payments (loans x months), month 1 being the first column.
+        guess (array, optional): Starting rate of each loan, for example the nominal monthly rate.
+        tolerance (float, optional): Tolerance of the rate.
+        max_iterations (int, optional): Iterations of Newton's method.
+
+    Returns:
+        array: Monthly rate of each loan, NaN if the payments do not cover the principal at any positive rate
+            above -100%.
+    """
+    cash_flows = np.atleast_2d(np.asarray(cash_flows, dtype=float))
+    principal = np.broadcast_to(np.asarray(principal, dtype=float), (len(cash_flows),))
+    months = np.arange(1, cash_flows.shape[1] + 1)
+    rate = np.zeros(len(cash_flows)) if guess is None else np.array(np.broadcast_to(guess, (len(cash_flows),)), dtype=float)
+
+    def npv(rate):
+        discount = (1 + rate[:, None]) ** -months
+        return (cash_flows * discount).sum(axis=1) - principal, discount
+
+    converged = np.zeros(len(cash_flows), dtype=bool)
+    with np.errstate(all='ignore'):
+        for _ in range(max_iterations):
+            value, discount = npv(rate)
+            derivative = -(cash_flows * months * discount).sum(axis=1) / (1 + rate)
+            step = value / derivative
+            rate = np.where(converged, rate, rate - step)
+            converged |= np.abs(step) < tolerance
+            if converged.all():
+                break
+
+        # bisection where Newton diverged: the NPV decreases with the rate for positive payments
+        pending = ~converged | ~np.isfinite(rate) | (rate <= -1)
+        if pending.any():
+            low = np.full(pending.sum(), -0.99)
+            high = np.full(pending.sum(), 1.0)
+            rows, total = cash_flows[pending], principal[pending]
+            for _ in range(200):
+                middle = (low + high) / 2
+                value = (rows * (1 + middle[:, None]) ** -months).sum(axis=1) - total
+                low = np.where(value > 0, middle, low)
+                high = np.where(value > 0, high, middle)
+                if np.all(high - low < tolerance):
+                    break
+            middle = (low + high) / 2
+            solved = (rows * (1 + middle[:, None]) ** -months).sum(axis=1) - total
+            rate[pending] = np.where(np.abs(solved) <= 1e-6 * np.maximum(total, 1), middle, np.nan)
+
+    return rate
+
+
+def compare_offers(offers:list[dict], capital:float, plazo_anos:int, amortizaciones_extraordinarias=None, sort_by:str='TAE') -> pd.DataFrame:
+    """
+    Effective annual rate (TAE) and total cost of each offer for the same loan, ranked.
+
+    The cash flows of an offer are its monthly payments with the related expenses (seguro_vida, seguro_vivienda,
+    alarma and gastos) and the extra amortizations of the plan with their commission. The TAE is
+    (1 + monthly IRR) ** 12 - 1, in percentage. A ValueError is raised if the TAE of an offer can not be
+    computed, instead of ranking it with a NaN.
+
+    Args:
+        offers (list): Offers with the parameters of OFFER_DEFAULTS; missing ones take their default value.
+        capital (float): Amount of the loan.
+        plazo_anos (int): Term in years.
+        amortizaciones_extraordinarias (list | AmortizationSchedule, optional): Plan of extra amortizations
+            applied to every offer, in the format of simulacion_hipoteca.
+        sort_by (str, optional): Column used to rank the offers, lowest first. Defaults to 'TAE'.
+
+    Returns:
+        DataFrame: One row per offer, ordered by `sort_by`, with its 'Rank'.
+    """
+    unknown = set().union(*(offer.keys() for offer in offers)) - set(OFFER_DEFAULTS) if offers else set()
+    if unknown:
+        raise ValueError(f"Unknown offer parameters: {sorted(unknown)}")
+    offers = [{**OFFER_DEFAULTS, **offer} for offer in offers]
+    num_meses = int(plazo_anos * 12)
+
+    interes_anual = np.array([offer['interes_anual'] for offer in offers], dtype=float)
+    comision = np.array([offer['comision_amortizacion'] for offer in offers], dtype=float)
+    vinculaciones = np.array([offer['seguro_vida'] + offer['seguro_vivienda'] + offer['alarma'] for offer in offers], dtype=float)
+    if any(offer['gastos'] for offer in offers):
+        vinculaciones = vinculaciones[:, None] + np.array([ExpenseCalendar(offer['gastos'], num_meses).totals for offer in offers])
+
+    montos = reduce_cuota = None
+    if amortizaciones_extraordinarias:
+        montos, reduce_cuota = matriz_amortizaciones([amortizaciones_extraordinarias], num_meses)
+        montos = np.broadcast_to(montos, (len(offers), num_meses))
+        reduce_cuota = np.broadcast_to(reduce_cuota, (len(offers), num_meses))
+
+    resultados = simulacion_hipoteca_lote(capital, interes_anual, plazo_anos, vinculaciones, montos, reduce_cuota,
+                                          comision, detalle=True)
+
+    cash_flows = resultados['Cuota']
+    principal = np.full(len(offers), float(capital))
+    if montos is not None:
+        # the extra amortization of month k is applied before its interest is charged, so it is paid at the
+        # end of month k - 1 (month 1's reduces the amount received)
+        pagado = np.arange(1, num_meses + 1) <= resultados['Num Pagos'][:, None]
+        extra = np.where(pagado, montos * (1 + comision[:, None] / 100), 0)
+        cash_flows = cash_flows.copy()
+        cash_flows[:, :-1] += extra[:, 1:]
+        principal -= extra[:, 0]
+
+    monthly_rate = irr(principal, cash_flows, guess=interes_anual / 100 / 12)
+    unsolved = np.flatnonzero(~np.isfinite(monthly_rate))
+    if len(unsolved):
+        names = [offers[i]['bank_name'] or f"#{i}" for i in unsolved]
+        raise ValueError(f"The TAE of the offers {names} can not be computed: their payments do not repay the capital")
+    total = cash_flows.sum(axis=1) + (capital - principal)
+
+    table = pd.DataFrame({
+        'bank_name': [offer['bank_name'] for offer in offers],
+        'interes_anual': interes_anual,
+        'comision_amortizacion': comision,
+        'TAE': np.round(((1 + monthly_rate) ** 12 - 1) * 100, 4),
+        'Cuota Mensual Total': resultados['Cuota Mensual Total'],
+        'Total Pagado': np.round(total, 2),
+        'Coste Total': np.round(total - capital, 2),
+        'Num Pagos': resultados['Num Pagos'],
+    })
+    table = table.sort_values(sort_by, kind='stable').reset_index(drop=True)
+    table.insert(0, 'Rank', np.arange(1, len(table) + 1))
+    return table
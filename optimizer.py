@@ -0,0 +1,190 @@
+import numpy as np
+
+from cache import annuity_payment
+from schedule import AmortizationSchedule
+
+# Debt below this amount is considered repaid
+_PAID_OFF = 0.005
+
+
+def _remaining_months(debt, payment, rate):
+    """
+    Months left to repay `debt` paying `payment` every month (the 'extra_term' formula of Mortage.amortization).
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if rate == 0:
+            return debt / payment
+        return np.where(payment > debt * rate, np.log(payment / (payment - debt * rate)) / np.log(1 + rate), np.inf)
+
+
+def _advance_year(debt, payment, rate):
+    """
+    Pays 12 monthly installments (or until the debt is repaid) using the closed form of the annuity.
+
+    Returns:
+        tuple: (debt at the end of the year, cash paid in installments, number of installments)
+    """
+    growth = 1 + rate
+    months_left = _remaining_months(debt, payment, rate)
+    pays_off = (months_left <= 12 + 1e-9) & (debt > 0)
+    last = np.clip(np.ceil(months_left - 1e-9), 1, 12)
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        if rate == 0:
+            end_debt = debt - 12 * payment
+            before_last = debt - (last - 1) * payment
+        else:
+            end_debt = debt * growth ** 12 - payment * (growth ** 12 - 1) / rate
+            before_last = debt * growth ** (last - 1) - payment * (growth ** (last - 1) - 1) / rate
+
+    paid = np.where(pays_off, (last - 1) * payment + before_last * growth, 12 * payment)
+    months = np.where(pays_off, last, 12)
+    end_debt = np.where(pays_off, 0, end_debt)
+
+    active = debt > 0
+    return np.where(active, end_debt, 0), np.where(active, paid, 0), np.where(active, months, 0)
+
+
+def _pareto_front(debt, cost, groups):
+    """
+    Indices of the states not dominated by another state of the same group with less debt and less cost.
+    """
+    order = np.lexsort((cost, debt) + tuple(groups[::-1]))
+    sorted_groups = np.stack([g[order] for g in groups])
+    starts = np.ones(len(order), dtype=bool)
+    starts[1:] = np.any(sorted_groups[:, 1:] != sorted_groups[:, :-1], axis=0)
+
+    # Running minimum of the cost inside each group: the offsets make every earlier group more expensive
+    group_rank = np.cumsum(starts)
+    span = np.ptp(cost) + 1 if len(cost) else 1
+    shifted = cost[order] + (group_rank[-1] - group_rank if len(order) else 0) * 2 * span
+    best_before = np.minimum.accumulate(shifted)
+    keep = starts.copy()
+    keep[1:] |= shifted[1:] < best_before[:-1]
+    return order[keep]
+
+
+def optimize_prepayments(capital:float, interest:float, term:int, yearly_budget:float=None, min_payment:float=1000,
+                         max_payment:float=None, step:float=1000, amortization_interest:float=0, objective='interest',
+                         debt_resolution:float=250, payment_resolution:float=5, max_states:int=20000) -> dict:
+    """
+    Finds the extra amortizations, at the end of each year, that optimize the objective.
+
+    Follows the semantics of Mortage.amortization: 'cuota' is an 'extra_payment' (the monthly payment is
+    recalculated for the remaining term) and 'plazo' is an 'extra_term' (the payment is kept and the term is
+    reduced). `amortization_interest` of every extra amortization is charged as a fee and does not reduce the debt.
+
+    The search is a dynamic programming over the years: the states (debt, monthly payment) reached each
+    year are grouped in buckets of `debt_resolution` and `payment_resolution`, only the cheapest one
+    of each bucket is kept, and states with more debt and more cost than another state with the same
+    payment are discarded. Years are advanced with the closed form of the annuity.
+
+    Args:
+        capital (float): Loan amount.
+        interest (float): Annual interest in percentage.
+        term (int): Term in years.
+        yearly_budget (float, optional): Cash available each year for the monthly installments plus the
+            extra amortization. Defaults to no limit.
+        min_payment (float): Minimum extra amortization (a smaller amount is only allowed to repay the whole debt).
+        max_payment (float, optional): Maximum extra amortization per year. Defaults to the capital.
+        step (float): Granularity of the amounts tried between `min_payment` and `max_payment`.
+        amortization_interest (float): Fee of the extra amortizations (0.005 for 0.5%).
+        objective (str | callable): 'interest' minimizes interest plus fees, 'term' minimizes the months to repay
+            the loan. A callable receives the arrays interest, fees and months and returns the score to minimize.
+        debt_resolution (float): Size of the debt buckets of the search.
+        payment_resolution (float): Size of the monthly payment buckets of the search.
+        max_states (int): Maximum states kept per year; the cheapest ones are kept.
+
+    Returns:
+        dict: 'schedule' (AmortizationSchedule), 'total_interest', 'fees', 'months' and 'score' of the best plan.
+    """
+    rate = interest / 100 / 12
+    fee = amortization_interest
+    if max_payment is None:
+        max_payment = capital
+    amounts = np.arange(min_payment, max_payment + step / 2, step) if max_payment >= min_payment else np.empty(0)
+
+    if objective == 'interest':
+        score_of = lambda interest, fees, months: interest + fees
+    elif objective == 'term':
+        score_of = lambda interest, fees, months: months + (interest + fees) * 1e-9
+    elif callable(objective):
+        score_of = objective
+    else:
+        raise ValueError(f"Unknown objective: {objective!r}")
+
+    debt = np.array([float(capital)])
+    payment = np.array([float(annuity_payment(float(capital), rate, term * 12))])
+    interest_paid = np.zeros(1)
+    fees = np.zeros(1)
+    months = np.zeros(1)
+    steps = []  # per year: (parent, amount, reduces payment)
+
+    for year in range(1, term + 1):
+        months_left = _remaining_months(debt, payment, rate) - 12
+        end_debt, paid, paid_months = _advance_year(debt, payment, rate)
+        interest_paid = interest_paid + paid - (debt - end_debt)
+        months = months + paid_months
+        debt = np.where(end_debt > _PAID_OFF, end_debt, 0)
+
+        open_ = debt > 0
+        if not open_.any() or year == term:
+            break
+
+        # Candidate amounts of every state: none, the grid and the amount that repays the whole debt
+        clear = debt / (1 - fee)
+        limit = np.full(len(debt), float(max_payment))
+        if yearly_budget is not None:
+            limit = np.minimum(limit, yearly_budget - paid)
+        candidates = np.concatenate([np.broadcast_to(amounts, (len(debt), len(amounts))), clear[:, None]], axis=1)
+        candidates = np.minimum(candidates, clear[:, None])
+        feasible = open_[:, None] & (candidates > 0) & (candidates <= limit[:, None] + 1e-9)
+
+        # Every feasible amount is tried reducing the term ('plazo') and reducing the payment ('cuota')
+        parent_idx, column = np.nonzero(feasible)
+        amount = candidates[parent_idx, column]
+        parent_idx = np.concatenate([np.arange(len(debt)), parent_idx, parent_idx])
+        reduces_payment = np.concatenate([np.zeros(len(debt) + len(amount), dtype=bool), np.ones(len(amount), dtype=bool)])
+        amount = np.concatenate([np.zeros(len(debt)), amount, amount])
+
+        new_debt = debt[parent_idx] - amount * (1 - fee)
+        new_debt = np.where(new_debt > _PAID_OFF, new_debt, 0)
+        new_payment = np.where(reduces_payment, annuity_payment(new_debt, rate, months_left[parent_idx]), payment[parent_idx])
+        new_payment = np.where(new_debt > 0, new_payment, 0)
+        new_interest = interest_paid[parent_idx]
+        new_fees = fees[parent_idx] + amount * fee
+        new_months = months[parent_idx]
+
+        # Keep the cheapest state of each (debt, payment) bucket; repaid loans are also split by their months
+        cost = new_interest + new_fees
+        keys = (np.round(new_debt / debt_resolution), np.round(new_payment / payment_resolution), np.where(new_debt > 0, -1, new_months))
+        order = np.lexsort((cost,) + keys[::-1])
+        sorted_keys = np.stack([k[order] for k in keys])
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = np.any(sorted_keys[:, 1:] != sorted_keys[:, :-1], axis=0)
+        keep = order[first]
+        keep = keep[_pareto_front(new_debt[keep], cost[keep], tuple(k[keep] for k in keys[1:]))]
+        if len(keep) > max_states:
+            keep = keep[np.argsort(cost[keep], kind='stable')[:max_states]]
+
+        steps.append((parent_idx[keep], amount[keep], reduces_payment[keep]))
+        debt, payment, interest_paid, fees, months = new_debt[keep], new_payment[keep], new_interest[keep], new_fees[keep], new_months[keep]
+
+    scores = score_of(interest_paid, fees, months)
+    best = int(np.argmin(scores))
+
+    schedule = AmortizationSchedule()
+    state = best
+    for year in range(len(steps), 0, -1):
+        parent_idx, amount, reduces_payment = steps[year - 1]
+        if amount[state] > 0:
+            schedule.add(mes=12 * year, monto=float(amount[state]), tipo='cuota' if reduces_payment[state] else 'plazo')
+        state = parent_idx[state]
+
+    return {
+        'schedule': schedule,
+        'total_interest': round(float(interest_paid[best]), 2),
+        'fees': round(float(fees[best]), 2),
+        'months': int(months[best]),
+        'score': float(scores[best]),
+    }
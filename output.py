@@ -0,0 +1,276 @@
+import csv
+import os
+
+import numpy as np
+
+
+class NullWriter:
+    """
+    Writer that discards everything, for simulations whose results are only needed in memory.
+    """
+
+    def __init__(self, fieldnames=None):
+        self.fieldnames = list(fieldnames or [])
+
+    def write_row(self, row):
+        pass
+
+    def write_columns(self, columns:dict):
+        pass
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CsvWriter(NullWriter):
+    """
+    Streams rows to a CSV file, writing them in chunks of `chunk_rows`.
+    """
+
+    def __init__(self, path, fieldnames, chunk_rows:int=1000):
+        super().__init__(fieldnames)
+        self.path = path
+        self.chunk_rows = chunk_rows
+        self._file = open(path, 'w', newline='')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(self.fieldnames)
+        self._rows = []
+
+    def write_row(self, row):
+        self._rows.append(row)
+        if len(self._rows) >= self.chunk_rows:
+            self.flush()
+
+    def write_columns(self, columns:dict):
+        self.flush()
+        self._writer.writerows(zip(*(np.asarray(columns[name]).tolist() for name in self.fieldnames)))
+
+    def flush(self):
+        self._writer.writerows(self._rows)
+        self._rows = []
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+
+class _ColumnarWriter(NullWriter):
+    """
+    Collects rows in chunks converted to columns; subclasses decide how the chunks are stored.
+    """
+
+    def __init__(self, path, fieldnames, chunk_rows:int=65536):
+        super().__init__(fieldnames)
+        self.path = path
+        self.chunk_rows = chunk_rows
+        self._rows = []
+        self._closed = False
+
+    def write_row(self, row):
+        self._rows.append(row)
+        if len(self._rows) >= self.chunk_rows:
+            self.flush()
+
+    def write_columns(self, columns:dict):
+        self.flush()
+        self._write_chunk({name: np.asarray(columns[name]) for name in self.fieldnames})
+
+    def flush(self):
+        if self._rows:
+            values = list(zip(*self._rows))
+            self._rows = []
+            self._write_chunk({name: np.asarray(values[i]) for i, name in enumerate(self.fieldnames)})
+
+    def _write_chunk(self, columns:dict):
+        raise NotImplementedError
+
+    def close(self):
+        if not self._closed:
+            self.flush()
+            self._finish()
+            self._closed = True
+
+    def _finish(self):
+        pass
+
+
+class ParquetWriter(_ColumnarWriter):
+    """
+    Streams rows to a Parquet file, one row group per chunk. Requires pyarrow.
+    """
+
+    def __init__(self, path, fieldnames, chunk_rows:int=65536):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            raise ImportError("Parquet output requires pyarrow, use a .csv or .npy destination instead") from e
+        super().__init__(path, fieldnames, chunk_rows)
+        self._pyarrow = pyarrow
+        self._writer = None
+
+    def _write_chunk(self, columns:dict):
+        table = self._pyarrow.table(columns)
+        if self._writer is None:
+            self._writer = self._pyarrow.parquet.ParquetWriter(self.path, table.schema)
+        self._writer.write_table(table)
+
+    def _finish(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def _npy_header(dtype, rows:int, size:int=0) -> bytes:
+    """
+    Header of a .npy file of `rows` records of `dtype`, padded with spaces to at least `size` bytes.
+    """
+    header = repr({'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False, 'shape': (rows,)})
+    # non-ASCII column names ('Amortización (€)') need version 3.0 of the format, with a 4-byte length
+    version, length_bytes = ((1, 0), 2) if header.isascii() else ((3, 0), 4)
+    header = header.encode('utf8')
+    prefix = len(np.lib.format.MAGIC_PREFIX) + 2 + length_bytes
+    total = max(size, prefix + len(header) + 1)
+    total += -total % 64
+    header += b' ' * (total - prefix - len(header) - 1) + b'\n'
+    return (np.lib.format.magic(*version) + len(header).to_bytes(length_bytes, 'little') + header)
+
+
+class NpyWriter(_ColumnarWriter):
+    """
+    Streams rows to a NumPy structured array file that can be opened with np.load(path, mmap_mode='r').
+
+    The header is reserved when the file is opened and written with the final number of rows when it is
+    closed; chunks are appended as they arrive. Text columns are fixed-width unicode of at least `text_width`
+    characters; if a later chunk has longer texts the rows already written are rewritten once with the
+    wider type.
+    """
+
+    # header space reserved for any number of rows
+    _MAX_ROWS = 10 ** 18
+
+    def __init__(self, path, fieldnames, chunk_rows:int=65536, text_width:int=32):
+        super().__init__(path, fieldnames, chunk_rows)
+        self.text_width = text_width
+        self._dtype = None
+        self._header_size = 0
+        self._written = 0
+        self._file = open(path, 'wb')
+
+    def _chunk_dtype(self, columns:dict):
+        fields = []
+        for name in self.fieldnames:
+            values = columns[name]
+            if values.dtype.kind == 'U':
+                width = max(values.dtype.itemsize // 4, self.text_width)
+                if self._dtype is not None and self._dtype[name].kind == 'U':
+                    width = max(width, self._dtype[name].itemsize // 4)
+                fields.append((name, f'<U{width}'))
+            elif self._dtype is not None:
+                fields.append((name, np.promote_types(self._dtype[name], values.dtype)))
+            else:
+                fields.append((name, values.dtype))
+        return np.dtype(fields)
+
+    def _start(self, dtype):
+        self._dtype = dtype
+        self._header_size = len(_npy_header(dtype, self._MAX_ROWS))
+        self._file.seek(0)
+        self._file.write(b'\0' * self._header_size)
+
+    def _widen(self, dtype):
+        # rewrite the rows already written with the wider type, a chunk at a time
+        old_dtype, old_header, rows = self._dtype, self._header_size, self._written
+        self._file.close()
+        tmp = f"{self.path}.tmp"
+        os.replace(self.path, tmp)
+        self._file = open(self.path, 'wb')
+        self._start(dtype)
+        if rows:
+            old = np.memmap(tmp, dtype=old_dtype, mode='r', offset=old_header, shape=(rows,))
+            for begin in range(0, rows, self.chunk_rows):
+                self._file.write(old[begin:begin + self.chunk_rows].astype(dtype).tobytes())
+            del old
+        os.remove(tmp)
+
+    def _write_chunk(self, columns:dict):
+        # text columns are stored as fixed-width unicode so the file can be memory-mapped
+        columns = {name: values.astype(str) if values.dtype == object else values for name, values in columns.items()}
+        dtype = self._chunk_dtype(columns)
+        if self._dtype is None:
+            self._start(dtype)
+        elif dtype != self._dtype:
+            self._widen(dtype)
+
+        chunk = np.empty(len(next(iter(columns.values()))), dtype=self._dtype)
+        for name in self.fieldnames:
+            chunk[name] = columns[name]
+        self._file.write(chunk.tobytes())
+        self._written += len(chunk)
+
+    def _finish(self):
+        if self._dtype is None:
+            self._start(np.dtype([(name, float) for name in self.fieldnames]))
+        self._file.seek(0)
+        self._file.write(_npy_header(self._dtype, self._written, self._header_size))
+        self._file.close()
+
+
+WRITERS = {
+    '.csv': CsvWriter,
+    '.parquet': ParquetWriter,
+    '.npy': NpyWriter,
+}
+
+
+def open_writer(destination, fieldnames):
+    """
+    Returns the writer for a destination: None discards the output, a path selects the format by its
+    extension (.csv, .parquet or .npy) and a writer object is returned as is.
+    """
+    if destination is None:
+        return NullWriter(fieldnames)
+    if isinstance(destination, NullWriter):
+        return destination
+
+    extension = os.path.splitext(str(destination))[1].lower()
+    if extension not in WRITERS:
+        raise ValueError(f"Unknown output format {extension!r}, expected one of {sorted(WRITERS)}")
+    return WRITERS[extension](destination, fieldnames)
+
+
+def write_summary(results:dict, destination, fields=None):
+    """
+    Writes the per-scenario summaries of simulacion_hipoteca_lote (or run_sweep's columns) in one table.
+    """
+    fields = fields or [name for name, values in results.items() if np.ndim(values) == 1]
+    with open_writer(destination, fields) as writer:
+        writer.write_columns({name: results[name] for name in fields})
+
+
+def write_schedules(scenarios:list[dict], destination_pattern:str, indices=None):
+    """
+    Writes the monthly schedule of the requested scenarios, re-simulating only those.
+
+    Args:
+        scenarios (list): Keyword arguments of simulacion_hipoteca for each scenario.
+        destination_pattern (str): Path of each file, formatted with the index of the scenario (e.g. 'detalle_{}.csv').
+        indices (list, optional): Scenarios to write. Defaults to all of them.
+
+    Returns:
+        list: Paths written.
+    """
+    from main_ import simulacion_hipoteca
+
+    paths = []
+    for i in range(len(scenarios)) if indices is None else indices:
+        path = destination_pattern.format(i)
+        simulacion_hipoteca(**scenarios[i], salida=path)
+        paths.append(path)
+    return paths
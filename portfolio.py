@@ -0,0 +1,201 @@
+"""
+Cash flow projection of a book of mortages.
+
+Loans are kept in a NumPy structured array (LOAN_DTYPE) and projected in chunks: every chunk is advanced
+month by month for all its loans at once and its flows are added to the totals of each calendar month
+(and bank). No per-loan schedule is kept, so the memory used depends on the chunk size and on the number
+of calendar months, not on the size of the book.
+
+    loans, banks = loans_from_arrays(capital, interest, term, start, bank_name)
+    projection = project_cash_flows(loans, banks, by_bank=True)
+    projection.write('cash_flows.csv')
+"""
+import numpy as np
+
+from output import open_writer
+
+# capital, annual interest in percentage, term in months, calendar month of the first payment and bank code
+LOAN_DTYPE = np.dtype([('capital', 'f8'), ('interest', 'f8'), ('term', 'i4'), ('start', 'i4'), ('bank', 'i4')])
+
+FIELDS = ['month', 'bank', 'loans', 'interest', 'principal', 'payment', 'balance']
+
+
+def loans_from_arrays(capital, interest, term, start=0, bank_name=None):
+    """
+    Builds the structured array of a book of loans.
+
+    Args:
+        capital (array): Amount of each loan.
+        interest (array): Annual interest in percentage.
+        term (array): Term in years, as in Mortage.
+        start (array, optional): Calendar month of the first payment, 0 being the first month of the projection.
+        bank_name (array, optional): Name of the bank of each loan.
+
+    Returns:
+        tuple: (loans, banks), `banks` being the names of the bank codes stored in the loans.
+    """
+    capital, interest, term, start = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(v)) for v in (capital, interest, term, start)))
+    loans = np.empty(len(capital), dtype=LOAN_DTYPE)
+    loans['capital'] = capital
+    loans['interest'] = interest
+    loans['term'] = np.rint(np.asarray(term, dtype=float) * 12)
+    loans['start'] = start
+
+    if bank_name is None:
+        loans['bank'] = 0
+        return loans, ['']
+    banks, codes = np.unique(np.broadcast_to(np.asarray(bank_name, dtype=object).astype(str), len(loans)),
+                             return_inverse=True)
+    loans['bank'] = codes
+    return loans, banks.tolist()
+
+
+def loans_from_mortages(mortages, start=0):
+    """
+    Builds the structured array of a book from Mortage instances, with the bank_name of set_bank_data.
+    """
+    mortages = list(mortages)
+    return loans_from_arrays([m._capital for m in mortages],
+                             [m._interest_rate * 100 for m in mortages],
+                             [m._term_years for m in mortages],
+                             start,
+                             [m._bank_data.get('bank_name', '') for m in mortages])
+
+
+def _chunks(loans, chunk_size:int):
+    if isinstance(loans, np.ndarray):
+        for begin in range(0, len(loans), chunk_size):
+            yield loans[begin:begin + chunk_size]
+    else:
+        yield from loans
+
+
+class CashFlowProjection:
+    """
+    Monthly flows of a book: arrays of (calendar months x groups), a group per bank or a single one.
+    """
+
+    def __init__(self, groups:list, first_year:int=2025):
+        self.groups = groups
+        self.first_year = first_year
+        self.loans = np.zeros((0, len(groups)), dtype=np.int64)
+        self.interest = np.zeros((0, len(groups)))
+        self.principal = np.zeros((0, len(groups)))
+        self.payment = np.zeros((0, len(groups)))
+        self.balance = np.zeros((0, len(groups)))
+
+    @property
+    def months(self):
+        return len(self.interest)
+
+    def _grow(self, months:int):
+        if months <= self.months:
+            return
+        for name in ('loans', 'interest', 'principal', 'payment', 'balance'):
+            values = getattr(self, name)
+            grown = np.zeros((months, len(self.groups)), dtype=values.dtype)
+            grown[:len(values)] = values
+            setattr(self, name, grown)
+
+    def label(self, month:int) -> str:
+        """
+        Calendar month with the format of Mortage's history ('2025-1' for month 0).
+        """
+        year, month = divmod(month, 12)
+        return f"{self.first_year + year}-{month + 1}"
+
+    def rows(self):
+        """
+        Yields one row (tuple of FIELDS) per calendar month and group.
+        """
+        for month in range(self.months):
+            label = self.label(month)
+            for group, name in enumerate(self.groups):
+                yield (label, name, int(self.loans[month, group]), float(self.interest[month, group]),
+                       float(self.principal[month, group]), float(self.payment[month, group]),
+                       float(self.balance[month, group]))
+
+    def write(self, destination):
+        """
+        Streams the rows to a .csv, .parquet or .npy file (see output.open_writer).
+        """
+        with open_writer(destination, FIELDS) as writer:
+            for row in self.rows():
+                writer.write_row(row)
+
+    def totals(self) -> dict:
+        """
+        Flows of the whole book per calendar month, adding the groups.
+        """
+        return {
+            'loans': self.loans.sum(axis=1),
+            'interest': self.interest.sum(axis=1),
+            'principal': self.principal.sum(axis=1),
+            'payment': self.payment.sum(axis=1),
+            'balance': self.balance.sum(axis=1)
+        }
+
+
+def project_cash_flows(loans, banks=None, by_bank:bool=False, chunk_size:int=100000, first_year:int=2025,
+                       destination=None) -> CashFlowProjection:
+    """
+    Projects the monthly interest, principal repaid and outstanding balance of a book of loans.
+
+    Every loan pays a fixed monthly payment (French amortization, as Mortage and simulacion_hipoteca) from
+    its start month; the last payment is limited to the outstanding balance.
+
+    Args:
+        loans (array | iterable): Structured array of LOAN_DTYPE (it can be memory-mapped) or an iterable
+            of such arrays, so books that do not fit in memory can be read in chunks.
+        banks (list, optional): Names of the bank codes, as returned by loans_from_arrays.
+        by_bank (bool, optional): Aggregate by bank as well as by calendar month.
+        chunk_size (int, optional): Loans advanced at once when `loans` is an array.
+        first_year (int, optional): Year of calendar month 0.
+        destination (optional): If given, the rows are also written there (see CashFlowProjection.write).
+
+    Returns:
+        CashFlowProjection: Flows per calendar month (and bank).
+    """
+    groups = list(banks) if by_bank else ['']
+    if by_bank and not groups:
+        raise ValueError("by_bank requires the names of the banks")
+    projection = CashFlowProjection(groups, first_year)
+    num_groups = len(groups)
+
+    for chunk in _chunks(loans, chunk_size):
+        if len(chunk) == 0:
+            continue
+        term = chunk['term'].astype(np.int64)
+        start = chunk['start'].astype(np.int64)
+        projection._grow(int((start + term).max()))
+        size = projection.months * num_groups
+
+        monthly_rate = chunk['interest'] / 100 / 12
+        with np.errstate(divide='ignore', invalid='ignore'):
+            annuity = np.where(monthly_rate == 0, term, (1 - (1 + monthly_rate) ** -term) / monthly_rate)
+            payment = np.where(term > 0, chunk['capital'] / annuity, 0)
+        balance = chunk['capital'].astype(float)
+        key = start * num_groups + (chunk['bank'] if by_bank else 0)
+
+        # loans of the chunk still paying, the arrays shrink as they finish
+        active = np.flatnonzero((term > 0) & (balance > 0))
+        age = 0
+        while len(active):
+            interest = balance[active] * monthly_rate[active]
+            principal = np.minimum(payment[active] - interest, balance[active])
+            balance[active] -= principal
+
+            keys = key[active] + age * num_groups
+            projection.loans += np.bincount(keys, minlength=size).reshape(-1, num_groups)
+            projection.interest += np.bincount(keys, interest, size).reshape(-1, num_groups)
+            projection.principal += np.bincount(keys, principal, size).reshape(-1, num_groups)
+            projection.payment += np.bincount(keys, interest + principal, size).reshape(-1, num_groups)
+            projection.balance += np.bincount(keys, np.maximum(balance[active], 0), size).reshape(-1, num_groups)
+
+            age += 1
+            active = active[(age < term[active]) & (balance[active] > 0)]
+
+    if destination is not None:
+        projection.write(destination)
+    return projection
@@ -0,0 +1,138 @@
+"""
+Batch rendering of the charts of many simulated mortages to PNG/PDF files.
+
+    render_reports({'customer_1': mortage_1, 'customer_2': mortage_2}, 'reports', format='pdf')
+
+The charts keep the layout of main.plot_history (debt on the left axis; payment, amortization and interest
+on the right one and the summary box). They are drawn with the non-interactive Agg canvas, each worker
+process builds one figure and reuses it for all its charts, and long schedules are downsampled.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from main import summarize
+
+_template = None
+
+
+def report_data(mortage, max_points:int=400) -> dict:
+    """
+    Picklable data of the chart of a simulated mortage, with at most `max_points` points per line.
+    """
+    history = mortage._history_buffer
+    monthly = history.column('type') == 'monthly_amortization'
+    time = history.column('time')[monthly]
+    months = len(time)
+
+    points = np.arange(months)
+    if months > max_points:
+        points = np.unique(np.linspace(0, months - 1, max_points).round().astype(int))
+    ticks = np.arange(0, months, 12)
+
+    return {
+        'title': mortage._bank_data.get('bank_name', ''),
+        'x': points,
+        'debt': history.column('debt')[monthly][points],
+        'payment': history.column('payment')[monthly][points],
+        'amortization': history.column('amortization')[monthly][points],
+        'interest': history.column('interest')[monthly][points],
+        'ticks': ticks,
+        'tick_labels': time[ticks].tolist(),
+        'summary': summarize(mortage),
+    }
+
+
+class ReportTemplate:
+    """
+    Figure with the axes, lines and summary box of main.plot_history, created once and filled for each chart.
+    """
+
+    def __init__(self):
+        # a bare Figure is drawn by the Agg canvas without pyplot, so the backend of the caller is left alone
+        from matplotlib.figure import Figure
+
+        # Create the figure and axes
+        self.fig = Figure(figsize=(10, 6))
+        self.ax1 = self.fig.subplots()
+        self.debt, = self.ax1.plot([], [], label='Debt (€)', color='blue')
+        self.ax1.set_xlabel('Time (Months)')
+        self.ax1.set_ylabel('Debt (€)', color='blue')
+        self.ax1.tick_params(axis='y', labelcolor='blue')
+        self.ax1.grid(True)
+
+        self.ax2 = self.ax1.twinx()
+        self.payment, = self.ax2.plot([], [], label='Payment (€)', color='orange', linestyle='--')
+        self.ax2.set_ylabel('Payment (€)', color='orange')
+        self.ax2.tick_params(axis='y', labelcolor='orange')
+        self.amortization, = self.ax2.plot([], [], label='Amortization (€)', color='green', linestyle='--')
+        self.interest, = self.ax2.plot([], [], label='Interest (€)', color='red', linestyle='--')
+
+        self.title = self.ax1.set_title('')
+        self.summary = self.fig.text(0.14, 0.17, '', fontsize=10, bbox=dict(facecolor='white', alpha=0.7))
+        self._laid_out = False
+
+    def render(self, data:dict, path:str):
+        x = data['x']
+        self.debt.set_data(x, data['debt'])
+        self.payment.set_data(x, data['payment'])
+        self.amortization.set_data(x, data['amortization'])
+        self.interest.set_data(x, data['interest'])
+        for ax in (self.ax1, self.ax2):
+            ax.relim()
+            ax.autoscale_view()
+
+        self.ax1.set_xticks(data['ticks'])
+        self.ax1.set_xticklabels(data['tick_labels'], rotation=45)
+        self.title.set_text(data['title'])
+
+        summary = data['summary']
+        self.summary.set_text(
+            f"Total pay: {summary['total_pay']:,.2f}€\n"
+            f"Total Interest: {summary['total_interest']:,.2f}€\n"
+            f"Total amortization: {summary['total_amortization']:,.2f}€\n"
+            f"Total monthyl payments: {summary['num_cuotes']}\n"
+            f"Initial cuote: {summary['initial_cuote']:,.2f}€\n"
+            f"Last cuote: {summary['last_cuotes']:,.2f}€"
+        )
+        if not self._laid_out:
+            # the labels of every chart have the same shape, the layout of the first one is kept
+            self.fig.tight_layout()
+            self._laid_out = True
+        self.fig.savefig(path)
+
+
+def _render(item) -> str:
+    global _template
+    data, path = item
+    if _template is None:
+        _template = ReportTemplate()
+    _template.render(data, path)
+    return path
+
+
+def render_reports(mortages, directory:str, format:str='png', workers:int=None, max_points:int=400) -> list[str]:
+    """
+    Saves the chart of each simulated mortage in `directory`.
+
+    Args:
+        mortages (dict | list): Simulated mortages by report name, or a list (named by their position).
+        directory (str): Directory of the files, created if needed.
+        format (str, optional): Extension of the files, any format supported by matplotlib ('png', 'pdf'...).
+        workers (int, optional): Worker processes. Defaults to the number of CPUs; 0 renders in this process.
+        max_points (int, optional): Maximum points per line.
+
+    Returns:
+        list: Paths of the files, in the order of `mortages`.
+    """
+    items = mortages.items() if isinstance(mortages, dict) else enumerate(mortages)
+    os.makedirs(directory, exist_ok=True)
+    jobs = [(report_data(mortage, max_points), os.path.join(directory, f"{name}.{format}")) for name, mortage in items]
+
+    workers = os.cpu_count() if workers is None else workers
+    if workers == 0 or len(jobs) <= 1:
+        return [_render(job) for job in jobs]
+
+    with ProcessPoolExecutor(min(workers, len(jobs))) as executor:
+        return list(executor.map(_render, jobs, chunksize=max(1, len(jobs) // (4 * workers))))
@@ -0,0 +1,132 @@
+import math
+import numbers
+
+import numpy as np
+
+TIPOS = ('cuota', 'plazo')
+
+
+class AmortizationSchedule:
+    """
+    Compiled schedule of extra amortizations indexed by month.
+
+    Events use the same dicts as `simulacion_hipoteca` ('mes', 'monto', 'tipo'). They are validated,
+    exact duplicates are dropped and the events of the same month are merged into one:
+    the amounts are added, the commission is applied over the total and then, if any of the
+    merged events is 'cuota', the monthly payment is recalculated; otherwise the term is reduced ('plazo').
+    """
+
+    def __init__(self, events=None):
+        self._events = []
+        self._keys = set()      # (mes, monto, tipo) of the events, to drop exact duplicates in O(1)
+        self._by_month = {}
+        for event in events or []:
+            self.add(**event)
+
+    @classmethod
+    def compile(cls, events):
+        """
+        Returns `events` if it already is a schedule, otherwise compiles the list of dicts.
+        """
+        if isinstance(events, cls):
+            return events
+        return cls(events)
+
+    @classmethod
+    def compile_copy(cls, events):
+        """
+        Like compile, but a schedule is copied, so editing the result never changes the caller's one.
+        """
+        if isinstance(events, cls):
+            return events.copy()
+        return cls(events)
+
+    def add(self, mes:int, monto:float, tipo:str='plazo', keep_duplicate:bool=False):
+        """
+        Adds an event, merged with the other events of its month. An exact duplicate of an event already in
+        the schedule is dropped unless `keep_duplicate` is True (an explicit edit that must always count).
+        """
+        # NumPy integers and floats are accepted (schedules built from np.arange or np.linspace), bools are not.
+        # Plain ints and floats skip the slower checks against the numbers ABCs.
+        if type(mes) is not int:
+            if isinstance(mes, (bool, np.bool_)) or not isinstance(mes, numbers.Integral):
+                raise ValueError(f"Invalid month for extra amortization: {mes!r}")
+            mes = int(mes)
+        if mes < 1:
+            raise ValueError(f"Invalid month for extra amortization: {mes!r}")
+        if type(monto) is not float and type(monto) is not int:
+            if isinstance(monto, (bool, np.bool_)) or not isinstance(monto, numbers.Real):
+                raise ValueError(f"Invalid amount for extra amortization: {monto!r}")
+            monto = monto.item() if isinstance(monto, np.generic) else monto
+        if not (math.isfinite(monto) and monto > 0):
+            raise ValueError(f"Invalid amount for extra amortization: {monto!r}")
+        if tipo not in TIPOS:
+            raise ValueError(f"Invalid type for extra amortization: {tipo!r}, expected one of {TIPOS}")
+
+        key = (mes, monto, tipo)
+        if key in self._keys and not keep_duplicate:
+            return
+        self._keys.add(key)
+        event = {'mes': mes, 'monto': monto, 'tipo': tipo}
+        self._events.append(event)
+
+        merged = self._by_month.get(mes)
+        if merged is None:
+            self._by_month[mes] = dict(event)
+        else:
+            merged['monto'] += monto
+            if tipo == 'cuota':
+                merged['tipo'] = 'cuota'
+
+    def replace(self, mes:int, monto:float, tipo:str='plazo'):
+        """
+        Replaces every event of a month with a new one. The event is validated first, so an invalid one
+        leaves the schedule unchanged.
+        """
+        event = AmortizationSchedule([{'mes': mes, 'monto': monto, 'tipo': tipo}]).events[0]
+        self.remove(event['mes'])
+        self.add(**event)
+
+    def remove(self, mes:int):
+        """
+        Removes every event of a month.
+        """
+        self._events = [event for event in self._events if event['mes'] != mes]
+        self._keys = {key for key in self._keys if key[0] != mes}
+        self._by_month.pop(mes, None)
+
+    def copy(self) -> 'AmortizationSchedule':
+        """
+        Independent copy of the schedule, without validating and merging the events again.
+        """
+        copy = AmortizationSchedule.__new__(AmortizationSchedule)
+        copy._events = list(self._events)
+        copy._keys = set(self._keys)
+        copy._by_month = {mes: dict(event) for mes, event in self._by_month.items()}
+        return copy
+
+    def get(self, mes):
+        """
+        Returns the merged event of a month or None.
+        """
+        return self._by_month.get(mes)
+
+    @property
+    def events(self):
+        return list(self._events)
+
+    @property
+    def meses(self):
+        return sorted(self._by_month)
+
+    def __iter__(self):
+        return (self._by_month[mes] for mes in self.meses)
+
+    def __len__(self):
+        return len(self._by_month)
+
+    def __bool__(self):
+        return bool(self._by_month)
+
+    def __repr__(self):
+        return f"AmortizationSchedule({self._events!r})"
@@ -0,0 +1,357 @@
+"""
+Local HTTP/JSON service of the simulator, with micro-batching.
+
+    python service.py --port 8080
+
+    POST /simulate   {"capital": 378000, "interes_anual": 2.1, "plazo_anos": 30, "seguro_vida": 88.67,
+                      "amortizaciones_extraordinarias": [{"mes": 36, "monto": 10000, "tipo": "cuota"}]}
+    GET  /health
+    GET  /metrics
+
+Requests that arrive within `window_ms` of each other are simulated together with simulacion_hipoteca_lote
+in a worker pool. Requests with a non-positive capital, negative rates or costs, or a term over
+MAX_PLAZO_ANOS years get 400. The queue is bounded: when it is full new requests are rejected with 503
+(backpressure), and requests not answered within `timeout` seconds get 504. Only the standard library and
+NumPy are used, and the service listens on 127.0.0.1 by default.
+"""
+import argparse
+import asyncio
+import collections
+import json
+import logging
+import math
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from batch import simulacion_hipoteca_lote
+from expenses import ExpenseCalendar
+from instrumentation import Instrumentation, logger
+from schedule import AmortizationSchedule
+
+# Parameters of a request and their default values, as in simulacion_hipoteca
+REQUEST_DEFAULTS = {
+    'capital': None,
+    'interes_anual': None,
+    'plazo_anos': None,
+    'seguro_vida': 0,
+    'seguro_vivienda': 0,
+    'alarma': 0,
+    'amortizaciones_extraordinarias': None,
+    'comision_amortizacion': 0,
+    'gastos': None,
+}
+
+# longest term accepted: every month of the longest loan is simulated for the whole batch
+MAX_PLAZO_ANOS = 50
+
+RESULT_FIELDS = ["Cuota Mensual Base", "Cuota Mensual Total", "Total Anual", "Total Pagado", "Num Pagos"]
+
+STATUS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large',
+          500: 'Internal Server Error', 503: 'Service Unavailable', 504: 'Gateway Timeout'}
+
+
+def parse_request(body:dict) -> dict:
+    """
+    Validates a simulation request and fills in the defaults. Raises ValueError if it is not valid.
+    """
+    if not isinstance(body, dict):
+        raise ValueError("The request must be a JSON object")
+    unknown = set(body) - set(REQUEST_DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown parameters: {sorted(unknown)}")
+    request = {**REQUEST_DEFAULTS, **body}
+    for name in ('capital', 'interes_anual', 'plazo_anos'):
+        if request[name] is None:
+            raise ValueError(f"{name} is required")
+    for name in ('capital', 'interes_anual', 'plazo_anos', 'seguro_vida', 'seguro_vivienda', 'alarma', 'comision_amortizacion'):
+        if isinstance(request[name], bool) or not isinstance(request[name], (int, float)) or not math.isfinite(request[name]):
+            raise ValueError(f"{name} must be a number, not {request[name]!r}")
+        if request[name] < 0:
+            raise ValueError(f"{name} can not be negative, not {request[name]!r}")
+    if request['capital'] == 0:
+        raise ValueError("capital must be positive")
+    if not 0 < request['plazo_anos'] <= MAX_PLAZO_ANOS or request['plazo_anos'] != int(request['plazo_anos']):
+        raise ValueError(f"plazo_anos must be a whole number of years from 1 to {MAX_PLAZO_ANOS}, not {request['plazo_anos']!r}")
+    # compiled here so invalid events are reported to their request, not to the whole batch
+    request['amortizaciones_extraordinarias'] = AmortizationSchedule(request['amortizaciones_extraordinarias']).events
+    ExpenseCalendar(request['gastos'], 0)
+    return request
+
+
+def _reject_constant(constant:str):
+    raise ValueError(f"{constant} is not a valid JSON number")
+
+
+def run_batch(requests:list[dict]) -> list[dict]:
+    """
+    Simulates a batch of parsed requests at once and returns the result of each one.
+    """
+    if not requests:
+        return []
+    num_meses = int(max(r['plazo_anos'] for r in requests)) * 12
+    vinculaciones = np.array([r['seguro_vida'] + r['seguro_vivienda'] + r['alarma'] for r in requests], dtype=float)
+    if any(r['gastos'] for r in requests):
+        vinculaciones = vinculaciones[:, None] + np.array([ExpenseCalendar(r['gastos'], num_meses).totals for r in requests])
+    amortizaciones = None
+    if any(r['amortizaciones_extraordinarias'] for r in requests):
+        amortizaciones = [r['amortizaciones_extraordinarias'] for r in requests]
+
+    resultados = simulacion_hipoteca_lote([r['capital'] for r in requests], [r['interes_anual'] for r in requests],
+                                          [r['plazo_anos'] for r in requests], vinculaciones, amortizaciones,
+                                          comision_amortizacion=[r['comision_amortizacion'] for r in requests])
+    return [{field: resultados[field][i].item() for field in RESULT_FIELDS} for i in range(len(requests))]
+
+
+class SimulationService:
+    """
+    Micro-batching simulation server.
+
+    Args:
+        host (str, optional): Address to listen on. Defaults to localhost only.
+        port (int, optional): Port, 0 for any free one (see `port` once started).
+        window_ms (float, optional): Time the first request of a batch waits for others to join it.
+        max_batch (int, optional): Maximum requests simulated together.
+        max_queue (int, optional): Requests waiting for a batch before new ones are rejected with 503.
+        timeout (float, optional): Seconds a request can wait for its result before 504.
+        workers (int, optional): Worker processes, and batches simulated at the same time. 0 simulates in a
+            thread of this process.
+        max_body (int, optional): Maximum size in bytes of a request body.
+    """
+
+    def __init__(self, host:str='127.0.0.1', port:int=8080, window_ms:float=5, max_batch:int=1024,
+                 max_queue:int=10000, timeout:float=5, workers:int=2, max_body:int=1024 ** 2):
+        self.host = host
+        self.port = port
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.workers = workers
+        self.max_body = max_body
+        self.instrumentation = Instrumentation()
+        self._latencies = collections.deque(maxlen=10000)   # (finish time, seconds) of the last requests
+        self._queue = None
+        self._server = None
+        self._executor = None
+        self._batcher = None
+        self._started = None
+
+    async def start(self):
+        self._queue = asyncio.Queue(self.max_queue)
+        if self.workers:
+            # forking a process that runs an event loop and its threads can deadlock the workers
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+            # workers are started and import NumPy now, not with the first batch
+            loop = asyncio.get_running_loop()
+            await asyncio.gather(*(loop.run_in_executor(self._executor, run_batch, []) for _ in range(self.workers)))
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._batcher = asyncio.create_task(self._batch_loop())
+        self._started = time.monotonic()
+        logger.info("simulation service listening on %s:%s", self.host, self.port)
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+        self._batcher.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def simulate(self, body:dict) -> dict:
+        """
+        Queues a request for the next batch and waits for its result.
+        """
+        request = parse_request(body)
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((request, future))   # asyncio.QueueFull when the service is saturated
+        return await asyncio.wait_for(future, self.timeout)
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(max(self.workers, 1))
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            # requests that already timed out are not simulated
+            batch = [(request, future) for request, future in batch if not future.done()]
+            if batch:
+                await slots.acquire()
+                asyncio.create_task(self._run(batch, slots))
+
+    async def _run(self, batch:list, slots:asyncio.Semaphore):
+        loop = asyncio.get_running_loop()
+        try:
+            with self.instrumentation.phase('batch'):
+                results = await loop.run_in_executor(self._executor, run_batch, [request for request, _ in batch])
+        except Exception as e:
+            logger.exception("batch of %s requests failed", len(batch))
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            self.instrumentation.count('batches')
+            self.instrumentation.count('batched_requests', len(batch))
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            slots.release()
+
+    def metrics(self) -> dict:
+        snapshot = self.instrumentation.snapshot()
+        counters = snapshot['counters']
+        now = time.monotonic()
+        latencies = np.array([seconds for _, seconds in self._latencies])
+        recent = sum(1 for finished, _ in self._latencies if now - finished <= 10)
+        uptime = now - self._started if self._started else 0
+        percentiles = np.percentile(latencies, [50, 95, 99]) * 1000 if len(latencies) else [None] * 3
+        return {
+            'uptime_s': uptime,
+            'queued': self._queue.qsize() if self._queue else 0,
+            'requests': counters.get('requests', 0),
+            'completed': counters.get('completed', 0),
+            'rejected': counters.get('rejected', 0),
+            'timeouts': counters.get('timeouts', 0),
+            'errors': counters.get('errors', 0),
+            'batches': counters.get('batches', 0),
+            'mean_batch_size': counters.get('batched_requests', 0) / max(counters.get('batches', 0), 1),
+            'batch_seconds': snapshot['timers'].get('batch', 0),
+            'throughput_rps': counters.get('completed', 0) / uptime if uptime else 0,
+            'recent_throughput_rps': recent / 10,
+            'latency_ms': dict(zip(('p50', 'p95', 'p99'), (None if p is None else float(p) for p in percentiles))),
+        }
+
+    async def _route(self, method:str, path:str, body:bytes):
+        if path == '/health':
+            return 200, {'status': 'ok', 'queued': self._queue.qsize(), 'max_queue': self.max_queue}
+        if path == '/metrics':
+            return 200, self.metrics()
+        if path != '/simulate':
+            return 404, {'error': f"Unknown path {path}"}
+        if method != 'POST':
+            return 405, {'error': "Use POST /simulate"}
+
+        self.instrumentation.count('requests')
+        start = time.monotonic()
+        try:
+            result = await self.simulate(json.loads(body or b'null', parse_constant=_reject_constant))
+        except (ValueError, TypeError) as e:
+            self.instrumentation.count('errors')
+            return 400, {'error': str(e)}
+        except asyncio.QueueFull:
+            self.instrumentation.count('rejected')
+            return 503, {'error': "Too many pending requests, retry later"}
+        except asyncio.TimeoutError:
+            self.instrumentation.count('timeouts')
+            return 504, {'error': f"No result within {self.timeout} s"}
+        except Exception as e:
+            self.instrumentation.count('errors')
+            return 500, {'error': str(e)}
+
+        if not all(math.isfinite(value) for value in result.values()):
+            self.instrumentation.count('errors')
+            logger.error("simulation without a finite result: %s", result)
+            return 500, {'error': "The simulation did not produce a finite result"}
+
+        finished = time.monotonic()
+        self.instrumentation.count('completed')
+        self._latencies.append((finished, finished - start))
+        return 200, result
+
+    async def _handle_connection(self, reader:asyncio.StreamReader, writer:asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self._respond(writer, 400, {'error': "Malformed request line"}, keep_alive=False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = headers.get('content-length') or '0'
+                if not (length.isascii() and length.isdigit()):
+                    await self._respond(writer, 400, {'error': "Invalid Content-Length"}, keep_alive=False)
+                    break
+                length = int(length)
+                if length > self.max_body:
+                    await self._respond(writer, 413, {'error': f"Body larger than {self.max_body} bytes"}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+                status, payload = await self._route(method, path.split('?')[0], body)
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer:asyncio.StreamWriter, status:int, payload:dict, keep_alive:bool):
+        try:
+            body = json.dumps(payload, allow_nan=False).encode()
+        except ValueError:
+            # NaN and Infinity are not JSON
+            status, body = 500, json.dumps({'error': "The response is not valid JSON"}).encode()
+        headers = [f"HTTP/1.1 {status} {STATUS[status]}", "Content-Type: application/json",
+                   f"Content-Length: {len(body)}", f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        if status == 503:
+            headers.append("Retry-After: 1")
+        writer.write(('\r\n'.join(headers) + '\r\n\r\n').encode() + body)
+        await writer.drain()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local HTTP/JSON service of simulacion_hipoteca with micro-batching.")
+    parser.add_argument('--host', default='127.0.0.1', help="address to listen on (localhost by default)")
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--window-ms', type=float, default=5, help="time a request waits for others to join its batch")
+    parser.add_argument('--max-batch', type=int, default=1024, help="maximum requests per batch")
+    parser.add_argument('--max-queue', type=int, default=10000, help="pending requests before answering 503")
+    parser.add_argument('--timeout', type=float, default=5, help="seconds before a request gets 504")
+    parser.add_argument('--workers', type=int, default=2, help="worker processes, 0 to simulate in a thread")
+    parser.add_argument('-v', '--verbose', action='store_true', help="log the service events")
+    args = parser.parse_args(argv)
+    if args.verbose:
+        logging.basicConfig(level=logging.INFO)
+
+    service = SimulationService(args.host, args.port, args.window_ms, args.max_batch, args.max_queue, args.timeout, args.workers)
+    try:
+        asyncio.run(service.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+import pandas as pd
+
+from batch import simulacion_hipoteca_lote
+
+# Parameters of the grid and their default values
+GRID_DEFAULTS = {
+    'cambio_ano': 0,                # year from which the extra amortizations reduce the term instead of the payment
+    'monto': 10000,                 # amount of each extra amortization
+    'frecuencia': 12,               # months between extra amortizations (0 for none)
+    'interes_anual': 2.1,
+    'plazo_anos': 30,
+    'comision_amortizacion': 0.5,
+}
+
+SUMMARY_FIELDS = ["Cuota Mensual Base", "Cuota Mensual Total", "Total Anual", "Total Pagado", "Num Pagos"]
+
+
+def expand_grid(grid:dict) -> list[dict]:
+    """
+    Expands a parameter grid (name -> value or list of values) into the list of scenarios.
+    Missing parameters take the value of GRID_DEFAULTS.
+    """
+    unknown = set(grid) - set(GRID_DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters: {sorted(unknown)}")
+
+    values = {}
+    for name, default in GRID_DEFAULTS.items():
+        value = grid.get(name, default)
+        values[name] = list(value) if isinstance(value, (list, tuple, range, np.ndarray)) else [value]
+
+    return [dict(zip(values, combination)) for combination in itertools.product(*values.values())]
+
+
+def _run_chunk(scenarios:list[dict], capital:float, vinculaciones:float) -> list[dict]:
+    columns = {name: np.array([s[name] for s in scenarios], dtype=float) for name in GRID_DEFAULTS}
+    num_pagos = (columns['plazo_anos'] * 12).astype(int)
+
+    # Extra amortization every `frecuencia` months; 'cuota' before the switch-over year, 'plazo' after it
+    meses = np.arange(1, num_pagos.max() + 1)
+    frecuencia = columns['frecuencia'][:, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        con_extra = (frecuencia > 0) & (np.fmod(meses, frecuencia) == 0) & (meses <= num_pagos[:, None])
+    montos = np.where(con_extra, columns['monto'][:, None], 0)
+    reduce_cuota = np.ceil(meses / 12) < columns['cambio_ano'][:, None]
+
+    resultados = simulacion_hipoteca_lote(capital, columns['interes_anual'], columns['plazo_anos'], vinculaciones,
+                                          montos, reduce_cuota, columns['comision_amortizacion'])
+
+    rows = []
+    for i, scenario in enumerate(scenarios):
+        row = dict(scenario)
+        row.update({field: resultados[field][i].item() for field in SUMMARY_FIELDS})
+        rows.append(row)
+    return rows
+
+
+def run_sweep(grid:dict, capital:float=378000, vinculaciones:float=0, workers:int=None, chunk_size:int=1000,
+              progress=None, cancel=None) -> pd.DataFrame:
+    """
+    Simulates every combination of a parameter grid in a pool of processes.
+
+    Args:
+        grid (dict): Values of each parameter of GRID_DEFAULTS, a single value or a list.
+        capital (float): Loan amount of every scenario.
+        vinculaciones (float): Monthly cost of the related expenses of every scenario.
+        workers (int, optional): Number of worker processes. Defaults to the number of CPUs; 1 runs in this process.
+        chunk_size (int): Scenarios sent to a worker at a time.
+        progress (callable, optional): Called as progress(done, total) each time a chunk finishes.
+        cancel (threading.Event, optional): When set, pending chunks are cancelled and the
+            scenarios finished so far are returned.
+
+    Returns:
+        pd.DataFrame: One row per scenario with the grid parameters and the simulation summary.
+    """
+    scenarios = expand_grid(grid)
+    chunks = [scenarios[i:i + chunk_size] for i in range(0, len(scenarios), chunk_size)]
+    workers = workers or os.cpu_count() or 1
+    rows = []
+
+    def finished(chunk_rows):
+        rows.extend(chunk_rows)
+        if progress is not None:
+            progress(len(rows), len(scenarios))
+
+    if workers == 1:
+        for chunk in chunks:
+            if cancel is not None and cancel.is_set():
+                break
+            finished(_run_chunk(chunk, capital, vinculaciones))
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, max(len(chunks), 1))) as executor:
+            pending = {executor.submit(_run_chunk, chunk, capital, vinculaciones) for chunk in chunks}
+            while pending:
+                if cancel is not None and cancel.is_set():
+                    for future in pending:
+                        future.cancel()
+                    break
+                done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                for future in done:
+                    finished(future.result())
+
+    table = pd.DataFrame(rows, columns=list(GRID_DEFAULTS) + SUMMARY_FIELDS)
+    return table.sort_values(list(GRID_DEFAULTS), ignore_index=True)
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from batch import matriz_amortizaciones, simulacion_hipoteca_lote
+from expenses import ExpenseCalendar
+from main_ import simulacion_hipoteca
+
+GASTOS = [{'name': 'hogar', 'value': 300, 'frequency': 'yearly'}, {'name': 'tasacion', 'value': 400, 'frequency': 'once'}]
+CLAVES = ["Cuota Mensual Base", "Cuota Mensual Total", "Total Anual", "Total Pagado"]
+
+
+def prestamos(n, seed=0):
+    rng = np.random.default_rng(seed)
+    capital = rng.uniform(5e4, 5e5, n).round(2)
+    interes = np.where(np.arange(n) % 5 == 0, 0, rng.uniform(0.5, 6, n).round(2))
+    plazo = rng.integers(5, 35, n)
+    comision = rng.choice([0, 0.5, 1], n)
+    amortizaciones = [[{'mes': int(mes), 'monto': float(monto), 'tipo': str(tipo)}
+                       for mes, monto, tipo in zip(rng.integers(1, 200, k), rng.uniform(1000, 30000, k).round(2),
+                                                   rng.choice(['cuota', 'plazo'], k))]
+                      for k in rng.integers(0, 4, n)]
+    return capital, interes, plazo, comision, amortizaciones
+
+
+@pytest.mark.parametrize('tamano_bloque', [7, 10000])
+def test_matches_simulacion_hipoteca(tamano_bloque):
+    capital, interes, plazo, comision, amortizaciones = prestamos(60)
+    vinculaciones = 50 + ExpenseCalendar(GASTOS, int(plazo.max()) * 12).totals[None, :]
+    resultados = simulacion_hipoteca_lote(capital, interes, plazo, vinculaciones, amortizaciones,
+                                          comision_amortizacion=comision, tamano_bloque=tamano_bloque)
+
+    for k in range(len(capital)):
+        esperado = simulacion_hipoteca(float(capital[k]), float(interes[k]), int(plazo[k]), seguro_vida=50,
+                                       amortizaciones_extraordinarias=amortizaciones[k],
+                                       comision_amortizacion=float(comision[k]), gastos=GASTOS)
+        assert {clave: resultados[clave][k] for clave in CLAVES} == pytest.approx(esperado, abs=0.011)
+        assert np.isfinite(resultados['Total Pagado'][k])
+
+
+def test_zero_rate():
+    resultados = simulacion_hipoteca_lote([100000, 100000], 0, 10, amortizaciones_extraordinarias=[
+        [], [{'mes': 61, 'monto': 20000, 'tipo': 'cuota'}]])
+
+    assert resultados['Cuota Mensual Base'].tolist() == [833.33, 500.0]
+    assert resultados['Total Pagado'].tolist() == [100000, 80000]
+    assert resultados['Num Pagos'].tolist() == [120, 120]
+
+
+def test_matrix_input_matches_the_list_input():
+    capital, interes, plazo, comision, amortizaciones = prestamos(20, seed=1)
+    montos, reduce_cuota = matriz_amortizaciones(amortizaciones, int(plazo.max()) * 12)
+
+    por_lista = simulacion_hipoteca_lote(capital, interes, plazo, 30, amortizaciones, comision_amortizacion=comision, detalle=True)
+    por_matriz = simulacion_hipoteca_lote(capital, interes, plazo, 30, montos, reduce_cuota, comision, detalle=True)
+    for clave in por_lista:
+        assert np.array_equal(por_lista[clave], por_matriz[clave])
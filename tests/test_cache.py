@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+from cache import ResultCache
+from main_ import simulacion_hipoteca
+
+
+def test_simulacion_hipoteca_uses_the_cache():
+    cache = ResultCache()
+    first = simulacion_hipoteca(200000, 2.1, 25, seguro_vida=30, cache=cache)
+    second = simulacion_hipoteca(200000, 2.1, 25, seguro_vida=30, cache=cache)
+
+    assert first == second == simulacion_hipoteca(200000, 2.1, 25, seguro_vida=30)
+    assert cache.stats()['misses'] == 1 and cache.stats()['hits'] == 1
+
+
+def test_cache_with_output_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        simulacion_hipoteca(200000, 2.1, 25, salida=str(tmp_path / 'detalle.csv'), cache=ResultCache())
+
+
+def disk_usage(directory):
+    return sum(os.path.getsize(directory / name) for name in os.listdir(directory) if name.endswith('.pkl'))
+
+
+def test_disk_is_only_scanned_to_evict(tmp_path, monkeypatch):
+    import cache as cache_module
+
+    scans = []
+    scandir = cache_module.os.scandir
+    monkeypatch.setattr(cache_module.os, 'scandir', lambda path: scans.append(path) or scandir(path))
+
+    cache = ResultCache(max_bytes=0, directory=str(tmp_path), max_disk_bytes=20000)
+    assert len(scans) == 1
+    for i in range(200):
+        cache.put(cache.key({'i': i}), list(range(100)))
+        assert disk_usage(tmp_path) <= 20000
+
+    assert cache.stats()['disk_bytes'] == disk_usage(tmp_path)
+    assert 1 < len(scans) < 20
+    # the newest results are kept, the oldest ones are evicted
+    assert cache.get(cache.key({'i': 199})) == list(range(100))
+    assert cache.get(cache.key({'i': 0})) is None
+
+
+def test_disk_size_is_read_at_startup(tmp_path):
+    first = ResultCache(directory=str(tmp_path))
+    first.put(first.key({'a': 1}), 'x' * 1000)
+    first.put(first.key({'a': 1}), 'y' * 500)
+
+    second = ResultCache(directory=str(tmp_path))
+    assert first.stats()['disk_bytes'] == second.stats()['disk_bytes'] == disk_usage(tmp_path)
+    assert second.get(second.key({'a': 1})) == 'y' * 500
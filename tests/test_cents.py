@@ -0,0 +1,63 @@
+from decimal import ROUND_HALF_EVEN, Decimal
+
+import numpy as np
+import pytest
+
+from batch import simulacion_hipoteca_lote
+from cents import simulacion_hipoteca_centimos
+
+
+def escenarios(n, seed=0):
+    rng = np.random.default_rng(seed)
+    capital = rng.uniform(5e4, 5e5, n).round(2)
+    interes = rng.uniform(0.01, 6, n).round(3)
+    plazo = rng.integers(5, 40, n)
+    amortizaciones = [[{'mes': int(rng.integers(1, 100)), 'monto': float(rng.uniform(1000, 20000)), 'tipo': 'cuota'}]
+                      for _ in range(n)]
+    return capital, interes, plazo, amortizaciones
+
+
+def referencia_decimal(capital, interes_anual, plazo_anos):
+    """
+    Total pagado e intereses de un préstamo en céntimos con Decimal y redondeo bancario en cada mes.
+    """
+    saldo = int(round(capital * 100))
+    interes_mensual = interes_anual / 100 / 12
+    num_pagos = plazo_anos * 12
+    cuota = int(round(saldo * interes_mensual / (1 - (1 + interes_mensual) ** -num_pagos)))
+    total = intereses = 0
+    for _ in range(num_pagos):
+        interes_mes = int((Decimal(saldo) * Decimal(str(interes_anual)) / Decimal(1200)).quantize(Decimal(1), rounding=ROUND_HALF_EVEN))
+        amortizacion = min(cuota - interes_mes, saldo)
+        saldo -= amortizacion
+        total += amortizacion + interes_mes
+        intereses += interes_mes
+        if saldo <= 0:
+            break
+    return total / 100, intereses / 100
+
+
+def test_matches_a_decimal_reference():
+    capital, interes, plazo, _ = escenarios(100)
+    resultado = simulacion_hipoteca_centimos(capital, interes, plazo)
+
+    for k in range(len(capital)):
+        assert referencia_decimal(float(capital[k]), float(interes[k]), int(plazo[k])) == \
+            (resultado['Total Pagado'][k], resultado['Intereses Totales'][k])
+
+
+# truncar la cuota y los intereses puede perder casi un céntimo en cada uno
+@pytest.mark.parametrize('redondeo, centimos_por_cuota', [('half_even', 0.01), ('half_up', 0.01), ('truncate', 0.02)])
+def test_close_to_the_float_simulation(redondeo, centimos_por_cuota):
+    capital, interes, plazo, amortizaciones = escenarios(2000)
+    argumentos = dict(vinculaciones=45.5, amortizaciones_extraordinarias=amortizaciones, comision_amortizacion=0.5)
+    centimos = simulacion_hipoteca_centimos(capital, interes, plazo, redondeo=redondeo, tamano_bloque=700, **argumentos)
+    flotante = simulacion_hipoteca_lote(capital, interes, plazo, **argumentos)
+
+    # las amortizaciones que dejan el saldo negativo no terminan igual: se comparan los demás escenarios
+    validos = centimos['Cuota Mensual Base'] > 0
+    assert validos.mean() > 0.9
+    assert np.array_equal(centimos['Num Pagos'][validos], flotante['Num Pagos'][validos])
+    diferencia = np.abs(centimos['Total Pagado'] - flotante['Total Pagado'])[validos]
+    assert np.all(diferencia <= centimos_por_cuota * centimos['Num Pagos'][validos])
+    assert np.all(np.abs(centimos['Cuota Mensual Total'] - flotante['Cuota Mensual Total']) <= 0.01 + 1e-9)
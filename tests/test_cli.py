@@ -0,0 +1,26 @@
+import json
+import math
+
+from cli import main
+from main import Mortage, summarize
+
+
+def test_summary_of_a_loan_repaid_in_a_few_installments():
+    mortage = Mortage(10000, 2, 1)
+    mortage.simulate([{'mes': 2, 'monto': 9000, 'tipo': 'plazo'}])
+
+    summary = summarize(mortage)
+    assert summary['num_cuotes'] == 2
+    assert summary['initial_cuote'] > 0
+    assert math.isnan(summary['last_cuotes'])
+
+
+def test_cli_prints_the_summary(capsys):
+    main(['--capital', '10000', '--interest', '2', '--term', '1', '--prepayment', '2:9000:plazo', '--format', 'json'])
+
+    def reject(constant):
+        raise ValueError(f"Invalid JSON constant {constant}")
+
+    summary = json.loads(capsys.readouterr().out, parse_constant=reject)
+    assert summary['num_cuotes'] == 2
+    assert summary['last_cuotes'] is None
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from closed_form import SimulacionAnalitica
+from incremental import SimulacionIncremental
+from main_ import simulacion_hipoteca
+
+GASTOS = [{'name': 'hogar', 'value': 300, 'frequency': 'yearly', 'indexation': 0.02}]
+
+
+def prestamos(n, seed=0):
+    rng = np.random.default_rng(seed)
+    for k in range(n):
+        plazo = int(rng.integers(1, 35))
+        amortizaciones = [{'mes': int(mes), 'monto': float(monto), 'tipo': str(tipo)}
+                          for mes, monto, tipo in zip(rng.integers(1, plazo * 12 + 1, 3), rng.uniform(1000, 40000, 3).round(2),
+                                                      rng.choice(['cuota', 'plazo'], 3))][:int(rng.integers(0, 4))]
+        yield dict(capital=round(rng.uniform(2e4, 4e5), 2), interes_anual=0.0 if k % 6 == 0 else round(rng.uniform(0.5, 6), 2),
+                   plazo_anos=plazo, seguro_vida=float(rng.choice([0, 35])), amortizaciones_extraordinarias=amortizaciones,
+                   comision_amortizacion=float(rng.choice([0, 0.5])), gastos=GASTOS if k % 2 else None)
+
+
+def comparar(entradas):
+    analitica = SimulacionAnalitica(**entradas)
+    incremental = SimulacionIncremental(**entradas)
+    resumen = analitica.resumen()
+
+    assert {clave: resumen[clave] for clave in incremental.resumen()} == pytest.approx(simulacion_hipoteca(**entradas), abs=0.011)
+    esperado = incremental.detalle()
+    assert resumen['Num Pagos'] == len(esperado['Cuota'])
+    for clave, valores in analitica.detalle().items():
+        np.testing.assert_allclose(valores, esperado[clave], atol=1e-6)
+    for mes in range(1, resumen['Num Pagos'] + 1):
+        assert analitica.saldo(mes) == pytest.approx(esperado['Saldo Restante'][mes - 1], abs=1e-6)
+
+
+@pytest.mark.parametrize('entradas', list(prestamos(300)))
+def test_matches_the_monthly_simulation(entradas):
+    comparar(entradas)
+
+
+@pytest.mark.parametrize('interes_anual', [0, 2.5])
+@pytest.mark.parametrize('tipo', ['cuota', 'plazo'])
+def test_prepayment_that_repays_the_loan(interes_anual, tipo):
+    entradas = dict(capital=100000, interes_anual=interes_anual, plazo_anos=10,
+                    amortizaciones_extraordinarias=[{'mes': 25, 'monto': 95000, 'tipo': tipo}])
+    comparar(entradas)
+    resumen = SimulacionAnalitica(**entradas).resumen()
+    assert resumen['Num Pagos'] == 25 and resumen['Saldo Restante'] == 0
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from expenses import Expense, ExpenseCalendar
+from main import Mortage
+
+
+def charged(expense, months=40):
+    amounts = expense.amounts(months)
+    return (np.nonzero(amounts)[0] + 1).tolist()
+
+
+def test_charges_at_the_end_of_each_period():
+    assert charged(Expense('alarm', 30)) == list(range(1, 41))
+    assert charged(Expense('home', 60, 'quarterly')) == list(range(3, 41, 3))
+    assert charged(Expense('life', 300, 'yearly')) == [12, 24, 36]
+    assert charged(Expense('review', 10, 5)) == [5, 10, 15, 20, 25, 30, 35, 40]
+
+
+def test_start_end_and_once():
+    assert charged(Expense('home', 60, 'quarterly', start=1)) == [1, 4, 7, 10, 13, 16, 19, 22, 25, 28, 31, 34, 37, 40]
+    assert charged(Expense('life', 300, 'yearly', end=30)) == [12, 24]
+    assert charged(Expense('appraisal', 400, 'once')) == [1]
+    assert charged(Expense('notary', 800, 'once', start=7)) == [7]
+    assert charged(Expense('late', 800, 'once', start=50)) == []
+
+
+def test_indexation_every_twelve_months_from_the_start():
+    amounts = Expense('alarm', 100, 'monthly', start=3, indexation=0.1).amounts(30)
+
+    assert amounts[:2].tolist() == [0, 0]
+    assert amounts[2:14] == pytest.approx([100] * 12)
+    assert amounts[14:26] == pytest.approx([110] * 12)
+    assert amounts[26] == pytest.approx(121)
+
+
+@pytest.mark.parametrize('frequency', ['weekly', 0])
+def test_invalid_frequency(frequency):
+    with pytest.raises(ValueError):
+        Expense('x', 1, frequency)
+
+
+def test_calendar():
+    calendar = ExpenseCalendar([Expense('alarm', 30), {'name': 'home', 'value': 60, 'frequency': 'quarterly'}], 12)
+
+    assert calendar.matrix.shape == (12, 2)
+    assert calendar.month_total(3) == 90 and calendar.month_total(4) == 30 and calendar.month_total(13) == 0
+    assert calendar.charges(6) == [('alarm', 30), ('home', 60)]
+    assert calendar.total(12) == 12 * 30 + 4 * 60
+
+
+def test_mortage_expense_rows():
+    mortage = Mortage(50000, 2, 3)
+    mortage.add_related_expense('alarm', 30)
+    mortage.add_related_expense('home', 60, 'quarterly')
+    mortage.add_related_expense('life', 300, 'yearly', indexation=0.05)
+    mortage.simulate()
+
+    history = mortage._history
+    expenses = history[history['type'] == 'extra_expense']
+
+    def months(name):
+        # the history is labelled year-month from 2025-1
+        return [(int(y) - 2025) * 12 + int(m) for y, m in expenses[expenses['frequency'] == name]['time'].str.split('-')]
+
+    assert months('alarm') == list(range(1, 37))
+    assert months('home') == list(range(3, 37, 3))
+    assert months('life') == [12, 24, 36]
+    assert expenses[expenses['frequency'] == 'life']['payment'].tolist() == pytest.approx([300, 315, 330.75])
+
+    expense = mortage.get_related_expense('home')
+    assert isinstance(expense, Expense) and expense.period == 3
+    assert (expense['name'], expense['value'], expense['frequency']) == ('home', 60, 'quarterly')
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from history import HistoryBuffer
+
+
+def filled(rows, capacity=2):
+    buffer = HistoryBuffer(capacity)
+    for i in range(rows):
+        buffer.append(debt=1000 - i, time=f"2025-{i + 1}", amortization=i, interest=i / 10, payment=i + i / 10,
+                      type='monthly_amortization', frequency='monthly')
+    return buffer
+
+
+def test_append_grows_past_the_capacity():
+    buffer = filled(5)
+
+    assert len(buffer) == 5 and buffer.capacity >= 5
+    assert buffer.column('debt').tolist() == [1000, 999, 998, 997, 996]
+    assert buffer.column('time')[-1] == '2025-5'
+
+
+def test_reserve_keeps_the_rows():
+    buffer = filled(3, capacity=3)
+    buffer.reserve(100)
+    buffer.reserve(10)
+
+    assert buffer.capacity == 100
+    assert buffer.column('amortization').tolist() == [0, 1, 2]
+
+
+def test_truncate_drops_later_rows():
+    buffer = filled(5)
+    frame = buffer.to_frame()
+    buffer.truncate(2)
+    buffer.truncate(4)
+
+    assert len(buffer) == 2 and len(frame) == 5
+    assert buffer.to_frame()['debt'].tolist() == [1000, 999]
+    buffer.append(debt=1, time='2025-3', amortization=0, interest=0, payment=0, type='extra', frequency='once')
+    assert buffer.column('type').tolist() == ['monthly_amortization', 'monthly_amortization', 'extra']
+
+
+def test_copy_is_independent():
+    buffer = filled(3)
+    copy = buffer.copy()
+    copy.append(debt=1, time='2025-4', amortization=0, interest=0, payment=0, type='extra', frequency='once')
+    buffer.truncate(1)
+
+    assert len(copy) == 4 and copy.column('debt').tolist() == [1000, 999, 998, 1]
+    assert len(buffer) == 1
+    assert len(HistoryBuffer().copy()) == 0
+
+
+def test_columns_are_read_only_views():
+    buffer = filled(2)
+    with pytest.raises(ValueError):
+        buffer.column('debt')[0] = 0
+    assert list(buffer.to_frame().columns) == HistoryBuffer.columns
+    assert np.array_equal(buffer.to_frame()['payment'], buffer.column('payment'))
@@ -0,0 +1,40 @@
+import pytest
+
+from incremental import SimulacionIncremental
+from main_ import simulacion_hipoteca
+
+AMORTIZACIONES = [{'mes': 24, 'monto': 10000, 'tipo': 'cuota'}, {'mes': 60, 'monto': 5000}]
+
+
+@pytest.mark.parametrize('intervalo', [0, 1, 12])
+def test_edits_match_a_full_simulation(intervalo):
+    simulacion = SimulacionIncremental(150000, 2.5, 20, seguro_vida=20, amortizaciones_extraordinarias=AMORTIZACIONES,
+                                       intervalo_checkpoint=intervalo)
+    simulacion.cambiar_amortizacion(60, 8000, 'cuota')
+    simulacion.anadir_amortizacion(100, 3000)
+
+    esperado = simulacion_hipoteca(150000, 2.5, 20, seguro_vida=20, amortizaciones_extraordinarias=[
+        AMORTIZACIONES[0], {'mes': 60, 'monto': 8000, 'tipo': 'cuota'}, {'mes': 100, 'monto': 3000}])
+    assert simulacion.resumen() == pytest.approx(esperado)
+
+
+def test_invalid_change_keeps_the_schedule():
+    simulacion = SimulacionIncremental(150000, 2.5, 20, amortizaciones_extraordinarias=AMORTIZACIONES)
+    resumen = simulacion.resumen()
+
+    with pytest.raises(ValueError):
+        simulacion.cambiar_amortizacion(24, -1)
+
+    assert simulacion.calendario.get(24) == AMORTIZACIONES[0]
+    simulacion.eliminar_amortizacion(60)
+    simulacion.anadir_amortizacion(60, 5000)
+    assert simulacion.resumen() == resumen
+
+
+def test_adding_the_same_extra_amortization_twice_counts_twice():
+    simulacion = SimulacionIncremental(150000, 2.5, 20, amortizaciones_extraordinarias=AMORTIZACIONES)
+    simulacion.anadir_amortizacion(60, 5000)
+
+    assert simulacion.calendario.get(60)['monto'] == 10000
+    esperado = simulacion_hipoteca(150000, 2.5, 20, amortizaciones_extraordinarias=[AMORTIZACIONES[0], {'mes': 60, 'monto': 10000}])
+    assert simulacion.resumen() == pytest.approx(esperado)
@@ -0,0 +1,65 @@
+import logging
+
+from instrumentation import Instrumentation, no_phase
+from main import Mortage, summarize
+
+SCHEDULE = [{'mes': 12, 'monto': 10000, 'tipo': 'cuota'}, {'mes': 36, 'monto': 5000, 'tipo': 'plazo'}]
+
+
+def simulated(instrumentation):
+    mortage = Mortage(100000, 2, 10)
+    mortage.set_instrumentation(instrumentation)
+    mortage.simulate(SCHEDULE)
+    return mortage
+
+
+def test_counters_of_a_simulation():
+    instrumentation = Instrumentation()
+    mortage = simulated(instrumentation)
+    counters = instrumentation.snapshot()['counters']
+
+    assert counters['months_simulated'] == summarize(mortage)['num_cuotes']
+    assert counters['events_applied'] == 2
+    assert counters['history_rows_written'] == len(mortage._history_buffer)
+    assert set(instrumentation.snapshot()['timers']) == {'simulate', 'amortization', 'related_expenses'}
+
+
+def test_hooks_receive_the_events():
+    instrumentation = Instrumentation()
+    events = []
+    hook = lambda event, **data: events.append((event, data))
+    instrumentation.add_hook(hook)
+    simulated(instrumentation)
+
+    months = [data for event, data in events if event == 'month']
+    assert [data['month'] for data in months] == list(range(1, len(months) + 1))
+    assert months[-1]['debt'] <= 0
+    assert [data for event, data in events if event == 'extra_amortization'] == [
+        {'month': 12, 'amount': 10000, 'type': 'cuota'}, {'month': 36, 'amount': 5000, 'type': 'plazo'}]
+    assert {data['name'] for event, data in events if event == 'phase'} == {'simulate', 'amortization', 'related_expenses'}
+
+    instrumentation.remove_hook(hook)
+    count = len(events)
+    simulated(instrumentation)
+    assert len(events) == count
+
+
+def test_timers_can_be_disabled_and_reset():
+    instrumentation = Instrumentation(timers=False)
+    assert instrumentation.phase('simulate') is no_phase('simulate')
+    simulated(instrumentation)
+    assert instrumentation.snapshot()['timers'] == {}
+
+    instrumentation.reset()
+    assert instrumentation.snapshot() == {'counters': {}, 'timers': {}}
+
+
+def test_months_are_logged_at_debug_level(caplog):
+    with caplog.at_level(logging.DEBUG, logger='mortage'):
+        simulated(None)
+    assert any(record.getMessage() == 'simulating 2025-1' for record in caplog.records)
+    caplog.clear()
+
+    with caplog.at_level(logging.INFO, logger='mortage'):
+        simulated(None)
+    assert not caplog.records
@@ -0,0 +1,94 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from instrumentation import Instrumentation
+from main import Mortage, summarize
+
+SCHEDULE = [{'mes': 24, 'monto': 10000, 'tipo': 'cuota'}, {'mes': 60, 'monto': 5000, 'tipo': 'plazo'}]
+
+
+def simulated(schedule=SCHEDULE, **kwargs):
+    mortage = Mortage(150000, 2.5, 20)
+    mortage.simulate(schedule, **kwargs)
+    return mortage
+
+
+def test_invalid_extra_amortization_keeps_the_simulation():
+    mortage = simulated()
+    summary = summarize(mortage)
+
+    with pytest.raises(ValueError):
+        mortage.set_extra_amortization(24, -1)
+
+    assert mortage._schedule.get(24) == SCHEDULE[0]
+    mortage.remove_extra_amortization(60)
+    mortage.add_extra_amortization(60, 5000)
+    assert summarize(mortage) == summary
+
+
+@pytest.mark.parametrize('checkpoint_every', [0, 12])
+def test_edits_match_a_full_simulation(checkpoint_every):
+    mortage = simulated(checkpoint_every=checkpoint_every)
+    mortage.set_extra_amortization(60, 8000, 'cuota')
+
+    expected = simulated([SCHEDULE[0], {'mes': 60, 'monto': 8000, 'tipo': 'cuota'}])
+    assert summarize(mortage) == summarize(expected)
+    assert mortage._history.equals(expected._history)
+
+
+def scenario(i, instrumentation=None):
+    mortage = Mortage(100000 + i * 100, 1 + (i % 7) * 0.3, 10 + i % 20)
+    mortage.set_bank_data(bank_name=f"bank {i}")
+    mortage.add_related_expense(f"expense {i}", i % 50 + 1, 'quarterly')
+    if instrumentation is not None:
+        mortage.set_instrumentation(instrumentation)
+    mortage.simulate([{'mes': 12, 'monto': 1000 + i, 'tipo': 'cuota'}])
+    return mortage
+
+
+def test_thread_pool_matches_sequential_runs():
+    sequential = [scenario(i) for i in range(500)]
+    instrumentation = Instrumentation()
+    with ThreadPoolExecutor(16) as executor:
+        parallel = list(executor.map(lambda i: scenario(i, instrumentation), range(500)))
+
+    for i, (expected, mortage) in enumerate(zip(sequential, parallel)):
+        assert summarize(mortage) == summarize(expected)
+        assert mortage._history.equals(expected._history)
+        assert list(mortage._related_expenses) == [f"expense {i}"]
+        assert mortage._bank_data == {'bank_name': f"bank {i}"}
+    assert instrumentation.snapshot()['counters']['months_simulated'] == sum(summarize(m)['num_cuotes'] for m in sequential)
+
+
+def test_clone_is_independent():
+    original = simulated()
+    clone = original.clone()
+    clone.set_extra_amortization(36, 20000)
+    clone.add_related_expense('alarm', 40)
+    clone.set_bank_data(bank_name='other')
+
+    untouched = simulated()
+    assert summarize(original) == summarize(untouched)
+    assert original._history.equals(untouched._history)
+    assert original._related_expenses == {} and original._bank_data == {}
+    assert original._schedule.meses == [24, 60]
+
+    # and the other way round: editing the original does not change the clone
+    clone_summary, clone_history = summarize(clone), clone._history.copy()
+    original.remove_extra_amortization(24)
+    original.add_related_expense('insurance', 30)
+    assert summarize(clone) == clone_summary
+    assert clone._history.equals(clone_history)
+    assert clone._schedule.meses == [24, 36, 60]
+    assert list(clone._related_expenses) == ['alarm']
+
+
+def test_adding_the_same_extra_amortization_twice_counts_twice():
+    mortage = simulated()
+    mortage.add_extra_amortization(36, 5000)
+    mortage.add_extra_amortization(36, 5000)
+
+    expected = simulated(SCHEDULE + [{'mes': 36, 'monto': 10000, 'tipo': 'plazo'}])
+    assert mortage._schedule.get(36)['monto'] == 10000
+    assert summarize(mortage) == summarize(expected)
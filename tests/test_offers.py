@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from cache import annuity_payment
+from offers import compare_offers, irr
+
+
+def test_irr_of_known_annuities():
+    rates = np.array([0, 0.001, 0.0025, 0.01])
+    payments = annuity_payment(100000, rates, 240)
+    cash_flows = np.broadcast_to(payments[:, None], (4, 240))
+
+    np.testing.assert_allclose(irr(100000, cash_flows), rates, atol=1e-10)
+    # payments that never repay the principal have no rate
+    assert np.isnan(irr(100000, np.full((1, 12), -10.0)))[0]
+
+
+def test_offer_without_costs_has_the_nominal_effective_rate():
+    table = compare_offers([{'bank_name': 'A', 'interes_anual': 3}, {'bank_name': 'B', 'interes_anual': 0}], 100000, 10)
+
+    assert table['bank_name'].tolist() == ['B', 'A']
+    assert table['TAE'].tolist() == [0, round(((1 + 0.03 / 12) ** 12 - 1) * 100, 4)]
+    assert table['Num Pagos'].tolist() == [120, 120]
+    assert table.loc[0, 'Total Pagado'] == 100000
+
+
+def test_offer_with_costs():
+    table = compare_offers([{'bank_name': 'A', 'interes_anual': 3, 'seguro_vida': 20}], 100000, 10)
+
+    # the monthly rate at which paying the annuity plus the insurance repays the capital
+    payment = float(annuity_payment(100000, 0.03 / 12, 120)) + 20
+    monthly_rate = (1 + table.loc[0, 'TAE'] / 100) ** (1 / 12) - 1
+    assert float(annuity_payment(100000, monthly_rate, 120)) == pytest.approx(payment, abs=0.01)
+    assert table.loc[0, 'TAE'] == 3.485
+    assert table.loc[0, 'Coste Total'] == pytest.approx(table.loc[0, 'Total Pagado'] - 100000)
+
+
+def test_related_expenses_and_ranking():
+    table = compare_offers([
+        {'bank_name': 'cheap rate', 'interes_anual': 2, 'seguro_vida': 60, 'alarma': 40},
+        {'bank_name': 'plain', 'interes_anual': 2.5},
+        {'bank_name': 'yearly insurance', 'interes_anual': 2, 'gastos': [{'name': 'hogar', 'value': 300, 'frequency': 'yearly'}]},
+    ], 200000, 25, amortizaciones_extraordinarias=[{'mes': 36, 'monto': 10000, 'tipo': 'cuota'}])
+
+    assert table['Rank'].tolist() == [1, 2, 3]
+    assert table['bank_name'].tolist() == ['yearly insurance', 'plain', 'cheap rate']
+    assert table['TAE'].is_monotonic_increasing
+
+
+def test_offers_without_a_tae_are_rejected():
+    with pytest.raises(ValueError, match='bad'):
+        compare_offers([{'bank_name': 'ok'}, {'bank_name': 'bad', 'seguro_vida': -2000}], 100000, 10)
+    with pytest.raises(ValueError):
+        compare_offers([{'bank': 'A'}], 100000, 10)
@@ -0,0 +1,59 @@
+import time
+
+import pytest
+
+from main import Mortage, summarize
+from optimizer import optimize_prepayments
+
+CASES = [
+    dict(capital=200000, interest=3, term=20, yearly_budget=20000),
+    dict(capital=200000, interest=3, term=20, yearly_budget=15000, amortization_interest=0.005),
+    dict(capital=200000, interest=3, term=20, max_payment=5000, objective='term'),
+    dict(capital=150000, interest=1.2, term=15, yearly_budget=14000),
+]
+
+
+def simulated(case, schedule):
+    mortage = Mortage(case['capital'], case['interest'], case['term'])
+    mortage.simulate(schedule, amortization_interest=case.get('amortization_interest', 0))
+    return mortage
+
+
+@pytest.mark.parametrize('case', CASES)
+def test_plan_matches_a_mortage_simulation(case):
+    plan = optimize_prepayments(**case)
+    mortage = simulated(case, plan['schedule'])
+    summary = summarize(mortage)
+
+    # the total interest of summarize includes the fees of the extra amortizations
+    assert plan['total_interest'] + plan['fees'] == pytest.approx(summary['total_interest'], abs=0.02)
+    assert plan['months'] == summary['num_cuotes']
+    assert len(plan['schedule']) > 0
+    assert all(event['mes'] % 12 == 0 for event in plan['schedule'])
+
+
+@pytest.mark.parametrize('case', [case for case in CASES if 'yearly_budget' in case])
+def test_yearly_budget_is_respected(case):
+    plan = optimize_prepayments(**case)
+    history = simulated(case, plan['schedule'])._history
+    yearly = history.groupby(history['time'].str.split('-').str[0])['payment'].sum()
+
+    assert yearly.max() <= case['yearly_budget'] + 0.01
+
+
+def test_interest_objective_beats_no_prepayments():
+    case = CASES[0]
+    plan = optimize_prepayments(**case)
+    assert plan['total_interest'] < summarize(simulated(case, None))['total_interest']
+
+
+def test_thirty_year_search_is_fast():
+    start = time.perf_counter()
+    optimize_prepayments(378000, 2.1, 30, yearly_budget=30000, amortization_interest=0.005)
+    # about 0.05-0.3 s depending on the machine; the bound leaves room for slow CI runners
+    assert time.perf_counter() - start < 2
+
+
+def test_unknown_objective():
+    with pytest.raises(ValueError):
+        optimize_prepayments(100000, 2, 10, objective='cost')
@@ -0,0 +1,35 @@
+import numpy as np
+
+from output import NpyWriter, open_writer
+
+
+def test_npy_writer_streams_chunks(tmp_path):
+    path = tmp_path / 'rows.npy'
+    with NpyWriter(path, ['Mes', 'Amortización (€)', 'tipo'], chunk_rows=10) as writer:
+        for mes in range(1, 26):
+            writer.write_row((mes, mes * 1.5, 'cuota'))
+
+    data = np.load(path, mmap_mode='r')
+    assert len(data) == 25
+    np.testing.assert_array_equal(data['Mes'], np.arange(1, 26))
+    np.testing.assert_array_equal(data['Amortización (€)'], np.arange(1, 26) * 1.5)
+    assert set(data['tipo']) == {'cuota'}
+
+
+def test_npy_writer_widens_text_columns(tmp_path):
+    path = tmp_path / 'rows.npy'
+    with open_writer(str(path), ['mes', 'tipo']) as writer:
+        writer.write_columns({'mes': np.arange(3), 'tipo': np.array(['a', 'b', 'c'], dtype=object)})
+        writer.write_columns({'mes': np.arange(3, 5), 'tipo': np.array(['x' * 100, 'y'], dtype=object)})
+
+    data = np.load(path)
+    assert data['tipo'].tolist() == ['a', 'b', 'c', 'x' * 100, 'y']
+    np.testing.assert_array_equal(data['mes'], np.arange(5))
+
+
+def test_npy_writer_without_rows(tmp_path):
+    path = tmp_path / 'empty.npy'
+    open_writer(str(path), ['a', 'b']).close()
+
+    data = np.load(path)
+    assert len(data) == 0 and data.dtype.names == ('a', 'b')
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from incremental import SimulacionIncremental
+from main import Mortage
+from portfolio import FIELDS, loans_from_arrays, loans_from_mortages, project_cash_flows
+
+
+def book(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return loans_from_arrays(rng.uniform(5e4, 5e5, n).round(2), np.where(np.arange(n) % 7 == 0, 0, rng.uniform(0.5, 5, n)),
+                             rng.integers(1, 30, n), rng.integers(0, 48, n), rng.choice(['A', 'B', 'C'], n))
+
+
+@pytest.mark.parametrize('interest', [0, 2.1])
+def test_a_loan_follows_simulacion_hipoteca(interest):
+    loans, _ = loans_from_arrays(200000, interest, 20, start=5)
+    projection = project_cash_flows(loans)
+    detalle = SimulacionIncremental(200000, interest, 20).detalle()
+
+    assert projection.months == 5 + 240
+    assert projection.loans[:5].sum() == 0 and projection.loans[5:, 0].tolist() == [1] * 240
+    np.testing.assert_allclose(projection.interest[5:, 0], detalle['Intereses'], atol=1e-6)
+    np.testing.assert_allclose(projection.principal[5:, 0], detalle['Amortización'], atol=1e-6)
+    np.testing.assert_allclose(projection.balance[5:, 0], detalle['Saldo Restante'], atol=1e-6)
+    assert projection.label(5) == '2025-6' and projection.label(12) == '2026-1'
+
+
+def test_book_totals_do_not_depend_on_chunks_or_banks():
+    loans, banks = book(500)
+    whole = project_cash_flows(loans, chunk_size=100000)
+    chunked = project_cash_flows(loans, chunk_size=37)
+    streamed = project_cash_flows(iter([loans[:200], loans[200:]]))
+    by_bank = project_cash_flows(loans, banks, by_bank=True, chunk_size=64)
+
+    for name, values in whole.totals().items():
+        np.testing.assert_allclose(chunked.totals()[name], values)
+        np.testing.assert_allclose(streamed.totals()[name], values)
+        np.testing.assert_allclose(by_bank.totals()[name], values)
+    # every loan is repaid: the principal adds up to the capital
+    assert whole.principal.sum() == pytest.approx(loans['capital'].sum())
+    for code, bank in enumerate(banks):
+        alone = project_cash_flows(loans[loans['bank'] == code]).balance[:, 0]
+        np.testing.assert_allclose(by_bank.balance[:len(alone), code], alone)
+        assert not by_bank.balance[len(alone):, code].any()
+
+
+def test_rows_and_mortages(tmp_path):
+    mortages = [Mortage(100000, 2, 1), Mortage(50000, 3, 2)]
+    mortages[0].set_bank_data(bank_name='Sabadell')
+    loans, banks = loans_from_mortages(mortages)
+    assert banks == ['', 'Sabadell']
+
+    projection = project_cash_flows(loans, banks, by_bank=True, destination=str(tmp_path / 'flows.csv'))
+    rows = list(projection.rows())
+    assert len(rows) == 24 * 2
+    assert rows[1] == ('2025-1', 'Sabadell', 1, pytest.approx(100000 * 0.02 / 12), pytest.approx(rows[1][4]),
+                       pytest.approx(rows[1][3] + rows[1][4]), pytest.approx(100000 - rows[1][4]))
+    lines = (tmp_path / 'flows.csv').read_text().splitlines()
+    assert len(lines) == 1 + len(rows) and lines[0].split(',') == FIELDS
+
+
+def test_by_bank_requires_the_banks():
+    loans, _ = book(3)
+    with pytest.raises(ValueError):
+        project_cash_flows(loans, [], by_bank=True)
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from schedule import AmortizationSchedule
+
+
+def test_numpy_months_and_amounts_are_accepted():
+    meses = np.arange(12, 37, 12)
+    schedule = AmortizationSchedule([{'mes': mes, 'monto': monto} for mes, monto in zip(meses, np.linspace(1000, 3000, 3))])
+
+    assert schedule.meses == [12, 24, 36]
+    assert schedule.get(24) == {'mes': 24, 'monto': 2000.0, 'tipo': 'plazo'}
+    assert type(schedule.get(24)['mes']) is int
+
+
+@pytest.mark.parametrize('event', [
+    {'mes': True, 'monto': 1000},
+    {'mes': np.bool_(True), 'monto': 1000},
+    {'mes': 1.0, 'monto': 1000},
+    {'mes': 0, 'monto': 1000},
+    {'mes': 1, 'monto': True},
+    {'mes': 1, 'monto': -1},
+    {'mes': 1, 'monto': float('nan')},
+    {'mes': 1, 'monto': float('inf')},
+    {'mes': 1, 'monto': np.inf},
+    {'mes': 1, 'monto': 1000, 'tipo': 'otro'},
+])
+def test_invalid_events_are_rejected(event):
+    with pytest.raises(ValueError):
+        AmortizationSchedule([event])
+
+
+def test_exact_duplicates_are_dropped():
+    schedule = AmortizationSchedule([{'mes': 12, 'monto': 1000}, {'mes': 12, 'monto': 1000.0}, {'mes': 12, 'monto': 500, 'tipo': 'cuota'}])
+    assert schedule.get(12) == {'mes': 12, 'monto': 1500, 'tipo': 'cuota'}
+
+    schedule.remove(12)
+    schedule.add(12, 1000)
+    assert schedule.get(12) == {'mes': 12, 'monto': 1000, 'tipo': 'plazo'}
+
+
+def test_many_events_compile_in_linear_time():
+    events = [{'mes': mes, 'monto': 100 + mes, 'tipo': 'plazo'} for mes in range(1, 20001)]
+    schedule = AmortizationSchedule(events + events)
+    assert len(schedule) == len(schedule.events) == 20000
+
+
+def test_copy_is_independent():
+    schedule = AmortizationSchedule([{'mes': 12, 'monto': 1000}])
+    copy = AmortizationSchedule.compile_copy(schedule)
+    copy.add(12, 500, 'cuota')
+    copy.add(24, 500)
+
+    assert schedule.get(12) == {'mes': 12, 'monto': 1000, 'tipo': 'plazo'} and schedule.meses == [12]
+    assert copy.get(12) == {'mes': 12, 'monto': 1500, 'tipo': 'cuota'} and copy.meses == [12, 24]
+    assert AmortizationSchedule.compile(schedule) is schedule
@@ -0,0 +1,77 @@
+import asyncio
+import json
+
+import pytest
+
+from service import MAX_PLAZO_ANOS, SimulationService, parse_request
+
+BODY = {'capital': 378000, 'interes_anual': 2.1, 'plazo_anos': 30}
+
+
+async def request(port, content_length, body=b''):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f"POST /simulate HTTP/1.1\r\nHost: x\r\nContent-Length: {content_length}\r\nConnection: close\r\n\r\n".encode() + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(payload, parse_constant=reject_constant)
+
+
+def reject_constant(constant):
+    raise ValueError(f"Invalid JSON constant {constant}")
+
+
+@pytest.mark.parametrize('content_length', ['abc', '-5', '+5', '1_0', '²'])
+def test_invalid_content_length_is_rejected(content_length):
+    async def main():
+        service = SimulationService(port=0, workers=0)
+        await service.start()
+        try:
+            status, _ = await request(service.port, content_length)
+            body = json.dumps(BODY).encode()
+            valid, result = await request(service.port, len(body), body)
+        finally:
+            await service.stop()
+        return status, valid, result
+
+    status, valid, result = asyncio.run(main())
+    assert status == 400
+    # the service keeps answering after rejecting the request
+    assert valid == 200 and result['Num Pagos'] == 360
+
+
+@pytest.mark.parametrize('body', [
+    {**BODY, 'capital': 0},
+    {**BODY, 'capital': -100000},
+    {**BODY, 'interes_anual': -1},
+    {**BODY, 'comision_amortizacion': -0.5},
+    {**BODY, 'seguro_vida': -20},
+    {**BODY, 'plazo_anos': MAX_PLAZO_ANOS + 1},
+    {**BODY, 'plazo_anos': 10 ** 9},
+    {**BODY, 'plazo_anos': 2.5},
+    {**BODY, 'capital': float('inf')},
+    {**BODY, 'amortizaciones_extraordinarias': [{'mes': 12, 'monto': float('inf')}]},
+])
+def test_invalid_requests(body):
+    with pytest.raises(ValueError):
+        parse_request(body)
+
+
+def test_zero_rate_and_non_finite_numbers_over_http():
+    async def main():
+        service = SimulationService(port=0, workers=0)
+        await service.start()
+        try:
+            body = json.dumps({**BODY, 'interes_anual': 0}).encode()
+            zero = await request(service.port, len(body), body)
+            body = b'{"capital": NaN, "interes_anual": 2, "plazo_anos": 10}'
+            nan = await request(service.port, len(body), body)
+        finally:
+            await service.stop()
+        return zero, nan
+
+    (status, result), (nan_status, _) = asyncio.run(main())
+    assert status == 200
+    assert result['Cuota Mensual Base'] == 1050 and result['Num Pagos'] == 360
+    assert nan_status == 400
@@ -0,0 +1,56 @@
+import math
+import threading
+
+import pytest
+
+from main_ import simulacion_hipoteca
+from sweep import GRID_DEFAULTS, expand_grid, run_sweep
+
+GRID = {'cambio_ano': [0, 3, 40], 'monto': [5000, 20000], 'frecuencia': [0, 12, 18, 60, 100], 'plazo_anos': 20}
+SUMMARY = ["Cuota Mensual Base", "Cuota Mensual Total", "Total Anual", "Total Pagado"]
+
+
+def expected(scenario, capital, vinculaciones):
+    months = int(scenario['plazo_anos'] * 12)
+    frequency = int(scenario['frecuencia'])
+    events = [{'mes': mes, 'monto': scenario['monto'], 'tipo': 'cuota' if math.ceil(mes / 12) < scenario['cambio_ano'] else 'plazo'}
+              for mes in range(frequency, months + 1, frequency)] if frequency else []
+    return simulacion_hipoteca(capital, scenario['interes_anual'], int(scenario['plazo_anos']), seguro_vida=vinculaciones,
+                               amortizaciones_extraordinarias=events, comision_amortizacion=scenario['comision_amortizacion'])
+
+
+def test_expand_grid():
+    scenarios = expand_grid(GRID)
+    assert len(scenarios) == 30
+    assert scenarios[0] == {**GRID_DEFAULTS, 'cambio_ano': 0, 'monto': 5000, 'frecuencia': 0, 'plazo_anos': 20}
+    with pytest.raises(ValueError):
+        expand_grid({'capital': 1})
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_sweep_matches_simulacion_hipoteca(workers):
+    table = run_sweep(GRID, capital=250000, vinculaciones=40, workers=workers, chunk_size=7)
+
+    assert len(table) == 30
+    for row in table.to_dict('records'):
+        scenario = {name: row[name] for name in GRID_DEFAULTS}
+        assert {field: row[field] for field in SUMMARY} == pytest.approx(expected(scenario, 250000, 40), abs=0.011)
+
+
+def test_progress_and_cancel():
+    cancel = threading.Event()
+    calls = []
+
+    def progress(done, total):
+        calls.append((done, total))
+        cancel.set()
+
+    table = run_sweep(GRID, workers=1, chunk_size=7, progress=progress, cancel=cancel)
+    assert calls == [(7, 30)]
+    assert len(table) == 7
+
+
+def test_cancelled_pool_returns_no_pending_chunks():
+    cancel = threading.Event()
+    cancel.set()
+    assert run_sweep(GRID, workers=2, chunk_size=7, cancel=cancel).empty
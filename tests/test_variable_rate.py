@@ -0,0 +1,30 @@
+import numpy as np
+
+from cache import annuity_payment
+from variable_rate import SEED_BLOCK, monte_carlo
+
+
+def test_results_do_not_depend_on_the_memory_budget():
+    n_paths = 3 * SEED_BLOCK + 100
+    small = monte_carlo(200000, 10, 1, n_paths=n_paths, seed=7, memory_budget_mb=0.1)
+    large = monte_carlo(200000, 10, 1, n_paths=n_paths, seed=7, memory_budget_mb=64)
+
+    for name in ('payment', 'debt', 'total_interest'):
+        np.testing.assert_array_equal(small[name], large[name])
+
+
+def test_different_seeds_give_different_paths():
+    first = monte_carlo(200000, 10, 1, n_paths=2000, seed=1)
+    second = monte_carlo(200000, 10, 1, n_paths=2000, seed=2)
+
+    assert not np.array_equal(first['total_interest'], second['total_interest'])
+
+
+def test_months_shared_by_every_path_are_exact():
+    result = monte_carlo(378000, 30, 1, interest=2.1, n_paths=5000, seed=3)
+    payment = float(annuity_payment(378000, 2.1 / 100 / 12, 360))
+
+    # every path pays the same until the first revision and has repaid the loan at maturity
+    np.testing.assert_allclose(result['payment'][:, :12], payment)
+    np.testing.assert_allclose(result['debt'][:, -1], 0, atol=1e-6)
+    assert np.all(np.diff(result['payment'][:, 12]) > 0)
@@ -0,0 +1,177 @@
+import math
+
+import numpy as np
+
+from cache import annuity_payment
+
+# paths drawn by each random generator: the generator of a block depends only on the seed and the block's
+# position, so the paths (and the results) do not depend on how many of them are simulated at once
+SEED_BLOCK = 4096
+
+
+class MeanRevertingIndex:
+    """
+    Mean-reverting (Vasicek) model of a reference index such as the Euribor, in annual percentage.
+
+    Each month the index moves `speed` towards `mean` plus a normal shock of `volatility` per year.
+    """
+
+    def __init__(self, initial:float=2.5, mean:float=2.5, speed:float=0.3, volatility:float=0.8):
+        self.initial = initial
+        self.mean = mean
+        self.speed = speed
+        self.volatility = volatility
+
+    def step(self, index, shocks):
+        dt = 1 / 12
+        return index + self.speed * (self.mean - index) * dt + self.volatility * math.sqrt(dt) * shocks
+
+    def paths(self, n_paths:int, months:int, seed=None):
+        """
+        Returns (n_paths x months) values of the index, month 1 being the initial value.
+        """
+        rng = np.random.default_rng(seed)
+        paths = np.empty((n_paths, months))
+        paths[:, 0] = self.initial
+        for month in range(1, months):
+            paths[:, month] = self.step(paths[:, month - 1], rng.standard_normal(n_paths))
+        return paths
+
+    def upper_bound(self, deviations:float=5):
+        """
+        Level the index only exceeds with negligible probability, from its stationary distribution.
+        """
+        stationary = self.volatility / math.sqrt(2 * self.speed) if self.speed > 0 else self.volatility * 5
+        return max(self.initial, self.mean) + deviations * stationary
+
+
+def _revised_rate(index, spread, floor, cap):
+    rate = index + spread
+    if floor is not None:
+        rate = np.maximum(rate, floor)
+    if cap is not None:
+        rate = np.minimum(rate, cap)
+    return rate
+
+
+def _histogram_percentiles(counts, low, high, percentiles, minimum=None, maximum=None):
+    """
+    Percentiles of every row of a histogram (rows x bins) interpolating inside the bins.
+
+    The interpolation can be off by up to one bin; with the `minimum` and `maximum` of the values of each
+    row the percentiles are clamped to them, so a row whose values are all equal gets exactly that value.
+    """
+    bins = counts.shape[1]
+    width = (high - low) / bins
+    cumulative = counts.cumsum(axis=1)
+    total = cumulative[:, -1:]
+    rows = np.arange(len(counts))
+    result = np.empty((len(percentiles), len(counts)))
+    for i, percentile in enumerate(percentiles):
+        target = total[:, 0] * percentile / 100
+        position = np.minimum((cumulative < target[:, None]).sum(axis=1), bins - 1)
+        before = np.where(position > 0, cumulative[rows, np.maximum(position - 1, 0)], 0)
+        inside = counts[rows, position]
+        fraction = np.where(inside > 0, (target - before) / np.maximum(inside, 1), 0)
+        result[i] = low + (position + np.clip(fraction, 0, 1)) * width
+    if minimum is not None:
+        result = np.clip(result, minimum, maximum)
+    return result
+
+
+def monte_carlo(capital:float, term:int, spread:float, index_model:MeanRevertingIndex=None, interest:float=None,
+                revision_months:int=12, floor:float=None, cap:float=None, n_paths:int=100000, seed=None,
+                percentiles=(5, 25, 50, 75, 95), memory_budget_mb:float=64, bins:int=2048, payment_range:float=None) -> dict:
+    """
+    Simulates a variable-rate mortage over `n_paths` random paths of the reference index.
+
+    The rate is `interest` until the first revision (index plus spread if not given) and then, every
+    `revision_months`, the index plus the spread limited by `floor` and `cap`; the monthly payment is
+    recalculated for the remaining term at each revision, as Mortage.revise_interest_rate does.
+
+    Paths are simulated in chunks whose size is derived from `memory_budget_mb` (a multiple of SEED_BLOCK
+    paths, each block with its own generator spawned from `seed`, so the same seed gives the same results
+    for any budget). The monthly payment and the outstanding debt of each month are accumulated in histograms
+    of `bins` buckets, which do not grow with the number of paths. Their percentiles are interpolated inside the
+    buckets and clamped to the minimum and maximum of each month, so a month where every path has the same value
+    (the first payment, the repaid debt at maturity) is exact. The total interest of every path is kept (8 bytes
+    per path, the only O(n_paths) memory) so its percentiles are exact.
+
+    Args:
+        capital (float): Loan amount.
+        term (int): Term in years.
+        spread (float): Spread over the index in percentage.
+        index_model (MeanRevertingIndex, optional): Model of the reference index.
+        interest (float, optional): Annual interest in percentage until the first revision.
+        revision_months (int): Months between rate revisions (6, 12...).
+        floor (float, optional): Minimum annual rate in percentage.
+        cap (float, optional): Maximum annual rate in percentage.
+        n_paths (int): Number of simulated paths.
+        seed (int, optional): Seed of the random generator.
+        percentiles (tuple): Percentiles of the bands.
+        memory_budget_mb (float): Approximate memory for the paths simulated at once.
+        bins (int): Buckets of the monthly histograms.
+        payment_range (float, optional): Upper limit of the payment histograms. Defaults to the payment
+            at the cap, or at a rate the index only exceeds with negligible probability.
+
+    Returns:
+        dict: 'percentiles', 'payment' and 'debt' (percentiles x months) and 'total_interest' (percentiles).
+    """
+    index_model = index_model or MeanRevertingIndex()
+    months = term * 12
+    if payment_range is None:
+        top_rate = cap if cap is not None else index_model.upper_bound() + spread
+        payment_range = float(annuity_payment(capital, top_rate / 100 / 12, months))
+
+    # about ten float64 arrays of chunk size are alive while a month is simulated
+    chunk_blocks = max(1, int(memory_budget_mb * 1024 ** 2 / (10 * 8)) // SEED_BLOCK)
+    chunk_size = chunk_blocks * SEED_BLOCK
+    generators = [np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(math.ceil(n_paths / SEED_BLOCK))]
+
+    payment_counts = np.zeros((months, bins), dtype=np.int64)
+    debt_counts = np.zeros((months, bins), dtype=np.int64)
+    total_interest = np.empty(n_paths)
+
+    # exact range of each month, the percentiles interpolated in the histograms are clamped to it
+    payment_seen = np.array([np.full(months, np.inf), np.full(months, -np.inf)])
+    debt_seen = payment_seen.copy()
+
+    def add(counts, seen, month, values, high):
+        buckets = np.clip((values * (bins / high)).astype(np.int64), 0, bins - 1)
+        counts[month] += np.bincount(buckets, minlength=bins)
+        seen[0, month] = min(seen[0, month], values.min())
+        seen[1, month] = max(seen[1, month], values.max())
+
+    for start in range(0, n_paths, chunk_size):
+        size = min(chunk_size, n_paths - start)
+        blocks = [(generator, min(SEED_BLOCK, n_paths - offset))
+                  for generator, offset in zip(generators[start // SEED_BLOCK:], range(start, start + size, SEED_BLOCK))]
+        index = np.full(size, float(index_model.initial))
+        annual_rate = np.full(size, interest if interest is not None else _revised_rate(index_model.initial, spread, floor, cap), dtype=float)
+        debt = np.full(size, float(capital))
+        payment = annuity_payment(debt, annual_rate / 100 / 12, months)
+        interest_paid = np.zeros(size)
+
+        for month in range(months):
+            if month > 0:
+                shocks = np.concatenate([generator.standard_normal(length) for generator, length in blocks])
+                index = index_model.step(index, shocks)
+                if month % revision_months == 0:
+                    annual_rate = _revised_rate(index, spread, floor, cap)
+                    payment = annuity_payment(debt, annual_rate / 100 / 12, months - month)
+
+            monthly_interest = debt * annual_rate / 100 / 12
+            debt = np.maximum(debt - (payment - monthly_interest), 0)
+            interest_paid += monthly_interest
+
+            add(payment_counts, payment_seen, month, payment, payment_range)
+            add(debt_counts, debt_seen, month, debt, capital)
+
+        total_interest[start:start + size] = interest_paid
+
+    return {
+        'percentiles': list(percentiles),
+        'payment': _histogram_percentiles(payment_counts, 0, payment_range, percentiles, *payment_seen),
+        'debt': _histogram_percentiles(debt_counts, 0, capital, percentiles, *debt_seen),
+        'total_interest': np.percentile(total_interest, percentiles),
+    }